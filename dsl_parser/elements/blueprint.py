@@ -25,7 +25,8 @@ from dsl_parser.elements import (imports,
                                  policies,
                                  data_types,
                                  version as _version)
-from dsl_parser.framework.elements import Element
+from dsl_parser.framework.elements import (Element,
+                                           unshared_copy)
 from dsl_parser.framework.requirements import Value
 
 
@@ -59,7 +60,8 @@ class BlueprintImporter(Element):
 
     def parse(self, resource_base):
         return {
-            'merged_blueprint': self.child(imports.ImportsLoader).value,
+            'merged_blueprint': self.child(
+                imports.ImportsLoader).frozen_value,
             'resource_base': resource_base
         }
 
@@ -94,24 +96,28 @@ class Blueprint(Element):
     def parse(self, workflow_plugins_to_install,
               deployment_plugins_to_install,
               scaling_groups):
-        return models.Plan({
-            constants.DESCRIPTION: self.child(misc.Description).value,
-            constants.NODES: self.child(node_templates.NodeTemplates).value,
+        # the plan is built from frozen values, which are shared with the
+        # elements and with each other, and copied once as a whole
+        return models.Plan(unshared_copy({
+            constants.DESCRIPTION: self.child(misc.Description).frozen_value,
+            constants.NODES: self.child(
+                node_templates.NodeTemplates).frozen_value,
             constants.RELATIONSHIPS: self.child(
-                relationships.Relationships).value,
-            constants.WORKFLOWS: self.child(workflows.Workflows).value,
-            constants.POLICY_TYPES: self.child(policies.PolicyTypes).value,
+                relationships.Relationships).frozen_value,
+            constants.WORKFLOWS: self.child(workflows.Workflows).frozen_value,
+            constants.POLICY_TYPES: self.child(
+                policies.PolicyTypes).frozen_value,
             constants.POLICY_TRIGGERS:
-                self.child(policies.PolicyTriggers).value,
+                self.child(policies.PolicyTriggers).frozen_value,
             constants.POLICIES:
-                self.child(policies.Policies).value,
-            constants.GROUPS: self.child(policies.Groups).value,
+                self.child(policies.Policies).frozen_value,
+            constants.GROUPS: self.child(policies.Groups).frozen_value,
             constants.SCALING_GROUPS: scaling_groups or {},
-            constants.INPUTS: self.child(misc.Inputs).value,
-            constants.OUTPUTS: self.child(misc.Outputs).value,
+            constants.INPUTS: self.child(misc.Inputs).frozen_value,
+            constants.OUTPUTS: self.child(misc.Outputs).frozen_value,
             constants.DEPLOYMENT_PLUGINS_TO_INSTALL:
                 deployment_plugins_to_install,
             constants.WORKFLOW_PLUGINS_TO_INSTALL: workflow_plugins_to_install,
             constants.VERSION: self.child(
-                _version.ToscaDefinitionsVersion).value
-        })
+                _version.ToscaDefinitionsVersion).frozen_value
+        }))
@@ -24,9 +24,11 @@ from dsl_parser.framework.elements import (
     DictElement,
     Leaf)
 from dsl_parser.framework.requirements import (
+    Index,
     Value,
     Requirement,
-    sibling_predicate)
+    name_index,
+    sibling_index)
 
 
 class SchemaPropertyDescription(Element):
@@ -61,7 +63,7 @@ class SchemaPropertyDefault(Element):
     requires = {
         SchemaPropertyType: [Requirement('component_types',
                                          required=False,
-                                         predicate=sibling_predicate)]
+                                         index=sibling_index)]
     }
 
     def parse(self, component_types):
@@ -157,10 +159,10 @@ class DataType(types.Type):
             Requirement('component_types',
                         multiple_results=True,
                         required=False,
-                        predicate=lambda source, target:
-                            target.name in source.direct_component_types),
+                        index=Index(lambda source:
+                                    source.direct_component_types)),
             Value('super_type',
-                  predicate=types.derived_from_predicate,
+                  index=types.derived_from_index,
                   required=False)
         ]
     }
@@ -203,11 +205,12 @@ class DataType(types.Type):
     def direct_component_types(self):
         if self._direct_component_types is None:
             direct_component_types = set()
-            parent_type = self.initial_value.get(constants.DERIVED_FROM)
+            parent_type = self.frozen_initial_value.get(
+                constants.DERIVED_FROM)
             if parent_type:
                 direct_component_types.add(parent_type)
             for desc in self.descendants(SchemaPropertyType):
-                direct_component_types.add(desc.initial_value)
+                direct_component_types.add(desc.frozen_initial_value)
             self._direct_component_types = direct_component_types
         return self._direct_component_types
 
@@ -228,11 +231,10 @@ class DataTypes(types.Types):
 
 # source: element describing data_type name
 # target: data_type
-def _has_type(source, target):
-    return source.initial_value == target.name
+_type_index = name_index(lambda source: source.frozen_initial_value)
 
 
 SchemaPropertyType.requires[DataType] = [
-    Value('data_type', predicate=_has_type, required=False),
-    Requirement('component_types', predicate=_has_type, required=False)
+    Value('data_type', index=_type_index, required=False),
+    Requirement('component_types', index=_type_index, required=False)
 ]
@@ -14,17 +14,21 @@
 #    * limitations under the License.
 
 import os
+import sys
 import urllib
+from multiprocessing.pool import ThreadPool
 
 import networkx as nx
 
 from dsl_parser import (exceptions,
                         constants,
+                        import_cache as _import_cache,
                         version as _version,
                         utils)
 from dsl_parser.framework.elements import (Element,
                                            Leaf,
                                            List)
+from dsl_parser.framework.requirements import Requirement
 
 
 MERGE_NO_OVERRIDE = set([
@@ -76,7 +80,8 @@ class ImportsLoader(Element):
                    'blueprint_location',
                    'version',
                    'resolver',
-                   'validate_version']
+                   'validate_version',
+                   Requirement('import_cache', required=False)]
     }
 
     resource_base = None
@@ -96,7 +101,8 @@ class ImportsLoader(Element):
               blueprint_location,
               version,
               resolver,
-              validate_version):
+              validate_version,
+              import_cache):
         if blueprint_location:
             blueprint_location = _dsl_location_to_url(
                 dsl_location=blueprint_location,
@@ -108,7 +114,8 @@ class ImportsLoader(Element):
                                 resources_base_url=resources_base_url,
                                 version=version,
                                 resolver=resolver,
-                                validate_version=validate_version)
+                                validate_version=validate_version,
+                                import_cache=import_cache)
 
     def calculate_provided(self, **kwargs):
         return {
@@ -133,7 +140,8 @@ def _dsl_location_to_url(dsl_location, resources_base_url):
 
 def _get_resource_location(resource_name,
                            resources_base_url,
-                           current_resource_context=None):
+                           current_resource_context=None,
+                           session=None):
     url_parts = resource_name.split(':')
     if url_parts[0] in ['http', 'https', 'file', 'ftp']:
         return resource_name
@@ -145,7 +153,7 @@ def _get_resource_location(resource_name,
     if current_resource_context:
         candidate_url = current_resource_context[
             :current_resource_context.rfind('/') + 1] + resource_name
-        if utils.url_exists(candidate_url):
+        if utils.url_exists(candidate_url, session=session):
             return candidate_url
 
     if resources_base_url:
@@ -156,11 +164,12 @@ def _get_resource_location(resource_name,
 
 def _combine_imports(parsed_dsl_holder, dsl_location,
                      resources_base_url, version, resolver,
-                     validate_version):
+                     validate_version, import_cache=None):
     ordered_imports = _build_ordered_imports(parsed_dsl_holder,
                                              dsl_location,
                                              resources_base_url,
-                                             resolver)
+                                             resolver,
+                                             import_cache)
     holder_result = parsed_dsl_holder.copy()
     version_key_holder, version_value_holder = parsed_dsl_holder.get_item(
         _version.VERSION)
@@ -173,14 +182,15 @@ def _combine_imports(parsed_dsl_holder, dsl_location,
                               parsed_imported_dsl_holder)
         _merge_parsed_into_combined(
             holder_result, parsed_imported_dsl_holder, version)
-    holder_result.value[version_key_holder] = version_value_holder
+    holder_result.set_item(version_key_holder, version_value_holder)
     return holder_result
 
 
 def _build_ordered_imports(parsed_dsl_holder,
                            dsl_location,
                            resources_base_url,
-                           resolver):
+                           resolver,
+                           import_cache=None):
 
     def location(value):
         return value or 'root'
@@ -188,6 +198,30 @@ def _build_ordered_imports(parsed_dsl_holder,
     imports_graph = ImportsGraph()
     imports_graph.add(location(dsl_location), parsed_dsl_holder)
 
+    resource_locations = {}
+    session = getattr(resolver, 'session', None)
+
+    def resource_location(another_import, current_import):
+        key = (another_import, current_import)
+        if key not in resource_locations:
+            resource_locations[key] = _get_resource_location(
+                another_import, resources_base_url, current_import,
+                session=session)
+        return resource_locations[key]
+
+    fetch_concurrency = getattr(resolver, 'fetch_concurrency', 1)
+    if fetch_concurrency > 1:
+        prefetched = _prefetch_imports(
+            parsed_dsl_holder=parsed_dsl_holder,
+            dsl_location=dsl_location,
+            root_location=location(dsl_location),
+            resource_location=resource_location,
+            resolver=resolver,
+            import_cache=import_cache,
+            fetch_concurrency=fetch_concurrency)
+    else:
+        prefetched = {}
+
     def _build_ordered_imports_recursive(_current_parsed_dsl_holder,
                                          _current_import):
         imports_key_holder, imports_value_holder = _current_parsed_dsl_holder.\
@@ -196,9 +230,7 @@ def _build_ordered_imports(parsed_dsl_holder,
             return
 
         for another_import in imports_value_holder.restore():
-            import_url = _get_resource_location(another_import,
-                                                resources_base_url,
-                                                _current_import)
+            import_url = resource_location(another_import, _current_import)
             if import_url is None:
                 ex = exceptions.DSLParsingLogicException(
                     13, "Import failed: no suitable location found for "
@@ -209,12 +241,18 @@ def _build_ordered_imports(parsed_dsl_holder,
                 imports_graph.add_graph_dependency(import_url,
                                                    location(_current_import))
             else:
-                raw_imported_dsl = resolver.fetch_import(import_url)
-                imported_dsl_holder = utils.load_yaml(
-                    raw_yaml=raw_imported_dsl,
-                    error_message="Failed to parse import '{0}' (via '{1}')"
-                                  .format(another_import, import_url),
-                    filename=another_import)
+                prefetched_import, imported_dsl_holder, exc_info = \
+                    prefetched.pop(import_url, (None, None, None))
+                if prefetched_import != another_import:
+                    # not prefetched, or prefetched through an import
+                    # name that would produce different marks and errors
+                    imported_dsl_holder = _fetch_and_load_import(
+                        resolver=resolver,
+                        import_url=import_url,
+                        filename=another_import,
+                        import_cache=import_cache)
+                elif exc_info:
+                    raise exc_info[0], exc_info[1], exc_info[2]
                 imports_graph.add(import_url, imported_dsl_holder,
                                   location(_current_import))
                 _build_ordered_imports_recursive(imported_dsl_holder,
@@ -223,6 +261,107 @@ def _build_ordered_imports(parsed_dsl_holder,
     return imports_graph.topological_sort()
 
 
+def _prefetch_imports(parsed_dsl_holder,
+                      dsl_location,
+                      root_location,
+                      resource_location,
+                      resolver,
+                      import_cache,
+                      fetch_concurrency):
+    """Fetch and load all imports breadth first, fetching all imports of
+    the same depth concurrently.
+
+    Returns a dict from import url to a (import name, loaded holder,
+    exc_info) tuple. Failures are recorded rather than raised, so they
+    surface at the same point of the depth first traversal that builds
+    the imports graph as they would without prefetching.
+    """
+    prefetched = {}
+    seen_urls = set([root_location])
+
+    def fetch(pending_import):
+        another_import, import_url = pending_import
+        try:
+            return (another_import,
+                    _fetch_and_load_import(resolver=resolver,
+                                           import_url=import_url,
+                                           filename=another_import,
+                                           import_cache=import_cache),
+                    None)
+        except Exception:
+            return another_import, None, sys.exc_info()
+
+    pool = ThreadPool(fetch_concurrency)
+    try:
+        current_level = [(parsed_dsl_holder, dsl_location)]
+        while current_level:
+            pending_imports = []
+            for current_holder, current_import in current_level:
+                for another_import in _import_names(current_holder):
+                    try:
+                        import_url = resource_location(another_import,
+                                                       current_import)
+                    except Exception:
+                        # reported by the depth first traversal
+                        continue
+                    if import_url is None or import_url in seen_urls:
+                        continue
+                    seen_urls.add(import_url)
+                    pending_imports.append((another_import, import_url))
+            current_level = []
+            results = pool.map(fetch, pending_imports)
+            for (_, import_url), result in zip(pending_imports, results):
+                prefetched[import_url] = result
+                if result[1] is not None:
+                    current_level.append((result[1], import_url))
+    finally:
+        pool.close()
+        pool.join()
+    return prefetched
+
+
+def _import_names(parsed_dsl_holder):
+    try:
+        _, imports_value_holder = parsed_dsl_holder.get_item(
+            constants.IMPORTS)
+        if not imports_value_holder:
+            return []
+        import_names = imports_value_holder.restore()
+    except ValueError:
+        return []
+    if not isinstance(import_names, list):
+        return []
+    return [i for i in import_names if isinstance(i, basestring)]
+
+
+def _fetch_and_load_import(resolver, import_url, filename, import_cache):
+    raw_imported_dsl = resolver.fetch_import(import_url)
+    return _load_import(raw_imported_dsl=raw_imported_dsl,
+                        import_url=import_url,
+                        filename=filename,
+                        import_cache=import_cache)
+
+
+def _load_import(raw_imported_dsl, import_url, filename, import_cache):
+    if import_cache is None:
+        digest = None
+    else:
+        digest = _import_cache.content_digest(raw_imported_dsl)
+        cached_holder = import_cache.get(import_url, digest,
+                                         filename=filename)
+        if cached_holder is not None:
+            return cached_holder
+    imported_dsl_holder = utils.load_yaml(
+        raw_yaml=raw_imported_dsl,
+        error_message="Failed to parse import '{0}' (via '{1}')"
+                      .format(filename, import_url),
+        filename=filename)
+    if import_cache is not None:
+        import_cache.put(import_url, digest, imported_dsl_holder,
+                         size=len(raw_imported_dsl))
+    return imported_dsl_holder
+
+
 def _validate_version(dsl_version,
                       import_url,
                       parsed_imported_dsl_holder):
@@ -251,7 +390,7 @@ def _merge_parsed_into_combined(combined_parsed_dsl_holder,
         if key_holder.value in IGNORE:
             pass
         elif key_holder.value not in combined_parsed_dsl_holder:
-            combined_parsed_dsl_holder.value[key_holder] = value_holder
+            combined_parsed_dsl_holder.set_item(key_holder, value_holder)
         elif key_holder.value in merge_no_override:
             _, to_dict = combined_parsed_dsl_holder.get_item(key_holder.value)
             _merge_into_dict_or_throw_on_duplicate(
@@ -273,7 +412,7 @@ def _merge_into_dict_or_throw_on_duplicate(from_dict_holder, to_dict_holder,
                                            key_name):
     for key_holder, value_holder in from_dict_holder.value.iteritems():
         if key_holder.value not in to_dict_holder:
-            to_dict_holder.value[key_holder] = value_holder
+            to_dict_holder.set_item(key_holder, value_holder)
         else:
             raise exceptions.DSLParsingLogicException(
                 4, "Import failed: Could not merge '{0}' due to conflict "
@@ -26,7 +26,12 @@ from dsl_parser.elements import (node_types as _node_types,
                                  data_types as _data_types,
                                  scalable,
                                  version as _version)
-from dsl_parser.framework.requirements import Value, Requirement
+from dsl_parser.framework.requirements import (Value,
+                                               Requirement,
+                                               Dependency,
+                                               Index,
+                                               name_index,
+                                               sibling_index)
 from dsl_parser.framework.elements import (DictElement,
                                            Element,
                                            Leaf,
@@ -55,13 +60,13 @@ class NodeTemplateProperties(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        NodeTemplateType: [],
+        NodeTemplateType: [Dependency(index=sibling_index)],
         _node_types.NodeTypes: [Value('node_types')],
         _data_types.DataTypes: [Value('data_types')]
     }
 
     def parse(self, node_types, data_types):
-        properties = self.initial_value or {}
+        properties = self.frozen_initial_value or {}
         node_type_name = self.sibling(NodeTemplateType).value
         node_type = node_types[node_type_name]
         return utils.merge_schema_and_instance_properties(
@@ -104,8 +109,8 @@ class NodeTemplateRelationshipTarget(Element):
     def validate(self):
         relationship_type = self.sibling(NodeTemplateRelationshipType).name
         node_name = self.ancestor(NodeTemplate).name
-        node_template_names = self.ancestor(NodeTemplates).initial_value.keys()
-        if self.initial_value not in node_template_names:
+        node_templates = self.ancestor(NodeTemplates).frozen_initial_value
+        if self.initial_value not in node_templates:
             raise exceptions.DSLParsingLogicException(
                 25, "A relationship instance under node '{0}' of type '{1}' "
                     "declares an undefined target node '{2}'"
@@ -123,7 +128,7 @@ class NodeTemplateRelationshipProperties(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        NodeTemplateRelationshipType: [],
+        NodeTemplateRelationshipType: [Dependency(index=sibling_index)],
         _relationships.Relationships: [Value('relationships')],
         _data_types.DataTypes: [Value('data_types')]
     }
@@ -131,7 +136,7 @@ class NodeTemplateRelationshipProperties(Element):
     def parse(self, relationships, data_types):
         relationship_type_name = self.sibling(
             NodeTemplateRelationshipType).value
-        properties = self.initial_value or {}
+        properties = self.frozen_initial_value or {}
         return utils.merge_schema_and_instance_properties(
             instance_properties=properties,
             schema_properties=relationships[relationship_type_name][
@@ -182,8 +187,12 @@ class NodeTemplateCapabilitiesScalable(DictElement):
             }
 
 
-def _instances_predicate(source, target):
-    return source.ancestor(NodeTemplate) is target.ancestor(NodeTemplate)
+def _node_template(element):
+    return element.ancestor(NodeTemplate)
+
+
+_instances_index = Index(source_keys=lambda source: [_node_template(source)],
+                         target_key=_node_template)
 
 
 class NodeTemplateCapabilities(DictElement):
@@ -196,7 +205,7 @@ class NodeTemplateCapabilities(DictElement):
         'inputs': ['validate_version'],
         NodeTemplateInstancesDeploy: [Value('instances_deploy',
                                             required=False,
-                                            predicate=_instances_predicate)]
+                                            index=_instances_index)]
     }
 
     def validate(self, version, validate_version, instances_deploy):
@@ -227,12 +236,11 @@ class NodeTemplateCapabilities(DictElement):
             }
 
 
-def _node_template_relationship_type_predicate(source, target):
+def _node_template_relationship_type(source):
     try:
-        return (source.child(NodeTemplateRelationshipType).initial_value ==
-                target.name)
+        return source.child(NodeTemplateRelationshipType).frozen_initial_value
     except exceptions.DSLParsingElementMatchException:
-        return False
+        return None
 
 
 class NodeTemplateRelationship(Element):
@@ -247,7 +255,7 @@ class NodeTemplateRelationship(Element):
     requires = {
         _relationships.Relationship: [
             Value('relationship_type',
-                  predicate=_node_template_relationship_type_predicate)]
+                  index=name_index(_node_template_relationship_type))]
     }
 
     def parse(self, relationship_type):
@@ -281,7 +289,8 @@ class NodeTemplateRelationships(Element):
                 NodeTemplateRelationshipTarget).value
             relationship_type = relationship.child(
                 NodeTemplateRelationshipType).value
-            type_hierarchy = relationship.value[constants.TYPE_HIERARCHY]
+            type_hierarchy = relationship.frozen_value[
+                constants.TYPE_HIERARCHY]
             if constants.CONTAINED_IN_REL_TYPE in type_hierarchy:
                 contained_in_relationships.append(relationship_type)
                 contained_in_targets.append(relationship_target)
@@ -299,34 +308,31 @@ class NodeTemplateRelationships(Element):
             raise ex
 
     def parse(self):
-        return [c.value for c in sorted(self.children(),
-                                        key=lambda child: child.index)]
+        return [c.frozen_value for c in sorted(self.children(),
+                                               key=lambda child: child.index)]
 
     def calculate_provided(self):
         contained_in_list = [r.child(NodeTemplateRelationshipTarget).value
                              for r in self.children()
                              if constants.CONTAINED_IN_REL_TYPE in
-                             r.value[constants.TYPE_HIERARCHY]]
+                             r.frozen_value[constants.TYPE_HIERARCHY]]
         contained_in = contained_in_list[0] if contained_in_list else None
         return {
             'contained_in': contained_in
         }
 
 
-def _node_template_related_nodes_predicate(source, target):
-    if source.name == target.name:
-        return False
+def _node_template_related_nodes(source):
     targets = source.descendants(NodeTemplateRelationshipTarget)
-    relationship_targets = [e.initial_value for e in targets]
-    return target.name in relationship_targets
+    return [e.frozen_initial_value for e in targets
+            if e.frozen_initial_value != source.name]
 
 
-def _node_template_node_type_predicate(source, target):
+def _node_template_node_type(source):
     try:
-        return (source.child(NodeTemplateType).initial_value ==
-                target.name)
+        return source.child(NodeTemplateType).frozen_initial_value
     except exceptions.DSLParsingElementMatchException:
-        return False
+        return None
 
 
 class NodeTemplate(Element):
@@ -342,12 +348,12 @@ class NodeTemplate(Element):
     requires = {
         'inputs': [Requirement('resource_base', required=False)],
         'self': [Value('related_node_templates',
-                       predicate=_node_template_related_nodes_predicate,
+                       index=Index(_node_template_related_nodes),
                        multiple_results=True)],
         _plugins.Plugins: [Value('plugins')],
         _node_types.NodeType: [
             Value('node_type',
-                  predicate=_node_template_node_type_predicate)],
+                  index=name_index(_node_template_node_type))],
         _node_types.NodeTypes: ['host_types']
     }
 
@@ -358,6 +364,10 @@ class NodeTemplate(Element):
               resource_base,
               related_node_templates):
         node = self.build_dict_result()
+        # the relationships get their operations set
+        node[constants.RELATIONSHIPS] = [
+            dict(relationship)
+            for relationship in node[constants.RELATIONSHIPS]]
         node.update({
             'name': self.name,
             'id': self.name,
@@ -485,7 +495,8 @@ class NodeTemplates(Element):
     ]
 
     def parse(self, host_types, plugins):
-        processed_nodes = dict((node.name, node.value)
+        # only the top level keys of the nodes are set
+        processed_nodes = dict((node.name, dict(node.frozen_value))
                                for node in self.children())
         _process_nodes_plugins(
             processed_nodes=processed_nodes,
@@ -501,7 +512,7 @@ class NodeTemplates(Element):
 
     def _deployment_plugins(self):
         deployment_plugins = {}
-        for node in self.value:
+        for node in self.frozen_value:
             for deployment_plugin in \
                     node[constants.DEPLOYMENT_PLUGINS_TO_INSTALL]:
                 plugin_name = deployment_plugin[constants.PLUGIN_NAME_KEY]
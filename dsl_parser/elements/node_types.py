@@ -33,7 +33,7 @@ class NodeType(types.Type):
     }
     requires = {
         'self': [requirements.Value('super_type',
-                                    predicate=types.derived_from_predicate,
+                                    index=types.derived_from_index,
                                     required=False)],
         _data_types.DataTypes: [requirements.Value('data_types')]
     }
@@ -303,5 +303,6 @@ def process_operation(
 
 
 def _resource_exists(resource_bases, resource_name):
-    return any(utils.url_exists('{0}/{1}'.format(resource_base, resource_name))
-               for resource_base in resource_bases if resource_base)
+    if not isinstance(resource_bases, utils.ResourceIndex):
+        resource_bases = utils.ResourceIndex(resource_bases)
+    return resource_bases.exists(resource_name)
@@ -24,7 +24,9 @@ from dsl_parser.elements import (node_templates as _node_templates,
                                  data_types,
                                  scalable,
                                  version as _version)
-from dsl_parser.framework.requirements import Value
+from dsl_parser.framework.requirements import (Value,
+                                               Dependency,
+                                               sibling_index)
 from dsl_parser.framework.elements import (DictElement,
                                            Element,
                                            Leaf,
@@ -93,7 +95,7 @@ class GroupPolicyProperties(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        GroupPolicyType: [],
+        GroupPolicyType: [Dependency(index=sibling_index)],
         PolicyTypes: [Value('policy_types')],
         data_types.DataTypes: [Value('data_types')]
     }
@@ -140,7 +142,7 @@ class GroupPolicyTriggerParameters(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        GroupPolicyTriggerType: [],
+        GroupPolicyTriggerType: [Dependency(index=sibling_index)],
         PolicyTriggers: [Value('policy_triggers')],
         data_types.DataTypes: [Value('data_types')]
     }
@@ -336,7 +338,7 @@ class Policies(DictElement):
         }
 
     def _create_scaling_groups(self, groups):
-        policies = self.value
+        policies = self.frozen_value
         scaling_policies = [policy for policy in policies.values()
                             if policy['type'] == constants.SCALING_POLICY]
         scaling_groups = {}
@@ -345,7 +347,8 @@ class Policies(DictElement):
             for target in policy['targets']:
                 group = groups[target]
                 scaling_groups[target] = {
-                    'members': group['members'],
+                    # members may be removed from scaling groups later on
+                    'members': list(group['members']),
                     'properties': properties
                 }
         return scaling_groups
@@ -374,11 +377,12 @@ class Policies(DictElement):
     @staticmethod
     def _validate_no_group_cycles(member_graph):
         # verify no group cycles (i.e. group A in group B and vice versa)
-        group_cycles = nx.recursive_simple_cycles(member_graph)
-        if group_cycles:
+        group_cycle = utils.find_cycle(sorted(member_graph),
+                                       member_graph.successors)
+        if group_cycle:
             raise exceptions.DSLParsingLogicException(
                 exceptions.ERROR_GROUP_CYCLE,
-                'Illegal group cycles found: {0}'.format(group_cycles))
+                'Illegal group cycles found: {0}'.format([group_cycle]))
 
     @staticmethod
     def _validate_members_in_one_group_only(member_graph):
@@ -36,7 +36,7 @@ class Relationship(types.Type):
         'inputs': [Requirement('resource_base', required=False)],
         _plugins.Plugins: [Value('plugins')],
         'self': [Value('super_type',
-                       predicate=types.derived_from_predicate,
+                       index=types.derived_from_index,
                        required=False)],
         _data_types.DataTypes: [Value('data_types')]
     }
@@ -17,6 +17,7 @@ from dsl_parser import exceptions
 from dsl_parser.framework.elements import (DictElement,
                                            Element,
                                            Leaf)
+from dsl_parser.framework.requirements import name_index
 
 
 class Types(DictElement):
@@ -35,8 +36,12 @@ class Type(Element):
 
     @staticmethod
     def fix_properties(value):
-        for key, value in value['properties'].iteritems():
-            value.pop('initial_default', None)
+        # the property schemas may be frozen values, so they are replaced
+        # by copies without the initial default
+        value['properties'] = dict(
+            (key, dict((k, v) for k, v in prop.iteritems()
+                       if k != 'initial_default'))
+            for key, prop in value['properties'].iteritems())
 
 
 class DerivedFrom(Element):
@@ -73,9 +78,11 @@ class DataTypeDerivedFrom(DerivedFrom):
     descriptor = 'data type'
 
 
-def derived_from_predicate(source, target):
+def _derived_from(source):
     try:
-        derived_from = source.child(DerivedFrom).initial_value
-        return derived_from and derived_from == target.name
+        return source.child(DerivedFrom).frozen_initial_value or None
     except exceptions.DSLParsingElementMatchException:
-        return False
+        return None
+
+
+derived_from_index = name_index(_derived_from)
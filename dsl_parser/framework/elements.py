@@ -28,6 +28,42 @@ class Unparsed(object):
 UNPARSED = Unparsed()
 
 
+class Unrestored(object):
+    pass
+
+
+UNRESTORED = Unrestored()
+
+# values of these types are never mutated in place, so they can be handed
+# out without copying
+_IMMUTABLE_TYPES = (basestring, int, long, float, type(None))
+
+
+def _copy(value):
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
+
+def unshared_copy(value):
+    """Returns a deep copy of ``value`` which references each of its dicts
+    and lists once.
+
+    Values built from frozen values may reference the same dict or list
+    from several places (e.g. a type default property value from every
+    node template of that type). ``copy.deepcopy`` keeps such references
+    shared, here each of them gets its own copy, so the result can be
+    changed in one place without affecting another.
+    """
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if type(value) is dict:
+        return dict((k, unshared_copy(v)) for k, v in value.iteritems())
+    if type(value) is list:
+        return [unshared_copy(v) for v in value]
+    return copy.deepcopy(value)
+
+
 class ElementType(object):
 
     def __init__(self, type):
@@ -59,7 +95,8 @@ class Element(object):
         self.context = context
         initial_value = holder.Holder.of(initial_value)
         self.initial_value_holder = initial_value
-        self._initial_value = initial_value.restore()
+        # restored on first access, see frozen_initial_value
+        self._initial_value = UNRESTORED
         self.start_line = initial_value.start_line
         self.start_column = initial_value.start_column
         self.end_line = initial_value.end_line
@@ -73,6 +110,11 @@ class Element(object):
         self.name_end_column = name.end_column
         self._parsed_value = UNPARSED
         self._provided = None
+        # element tree, maintained by the parsing context
+        self.element_id = None
+        self.parent_element = None
+        self.child_elements = []
+        self.child_elements_by_type = {}
 
     def __str__(self):
         message = StringIO()
@@ -86,7 +128,7 @@ class Element(object):
             message.write('\n  in line {0}, column {1}'
                           .format(self.start_line + 1, self.start_column))
         message.write('\n  path: {0}'.format(self.path))
-        message.write('\n  value: {0}'.format(self._initial_value))
+        message.write('\n  value: {0}'.format(self.frozen_initial_value))
 
         return message.getvalue()
 
@@ -103,15 +145,58 @@ class Element(object):
 
     @property
     def initial_value(self):
-        return copy.deepcopy(self._initial_value)
+        return _copy(self.frozen_initial_value)
+
+    @property
+    def frozen_initial_value(self):
+        """The initial value, without copying it.
+
+        Frozen values are shared with the element and must not be mutated,
+        use ``initial_value`` for a private copy.
+        """
+        if self._initial_value is UNRESTORED:
+            self._initial_value = self._restore_initial_value()
+        return self._initial_value
+
+    def _restore_initial_value(self):
+        # the values of already restored children (when processing in
+        # topological order, that is all of them) are reused instead of
+        # restoring their holders again. frozen values must not be mutated,
+        # so sharing them is safe, unless the same holder (i.e. a yaml
+        # alias) appears more than once in this element value
+        restored = {}
+        for child in self.child_elements:
+            if child._initial_value is not UNRESTORED:
+                key = id(child.initial_value_holder)
+                restored[key] = UNRESTORED if key in restored \
+                    else child._initial_value
+        value_holder = self.initial_value_holder
+        value = value_holder.value
+        if not restored or not isinstance(value, (dict, list)):
+            return value_holder.restore()
+
+        def restore(item_holder):
+            item = restored.get(id(item_holder), UNRESTORED)
+            if item is UNRESTORED:
+                return item_holder.restore()
+            return item
+        if isinstance(value, dict):
+            return dict((key_holder.restore(), restore(item_holder))
+                        for key_holder, item_holder in value.iteritems())
+        return [restore(item_holder) for item_holder in value]
 
     @property
     def value(self):
+        return _copy(self.frozen_value)
+
+    @property
+    def frozen_value(self):
+        """The parsed value, without copying it (must not be mutated)."""
         if self._parsed_value == UNPARSED:
             raise exceptions.DSLParsingSchemaAPIException(
                 exceptions.ERROR_CODE_ILLEGAL_VALUE_ACCESS,
                 'Cannot access element value before parsing')
-        return copy.deepcopy(self._parsed_value)
+        return self._parsed_value
 
     @value.setter
     def value(self, val):
@@ -122,7 +207,13 @@ class Element(object):
 
     @property
     def provided(self):
-        return copy.deepcopy(self._provided)
+        return _copy(self._provided)
+
+    @property
+    def frozen_provided(self):
+        """The provided values, without copying them (must not be
+        mutated)."""
+        return self._provided
 
     @provided.setter
     def provided(self, value):
@@ -130,16 +221,19 @@ class Element(object):
 
     @property
     def path(self):
-        elements = [str(e.name) for e in self.context.ancestors_iter(self)]
-        if elements:
-            elements.pop()
+        elements = [str(self.name)]
+        current_element = self.parent_element
+        # the root element name is not part of the path
+        while current_element is not None and \
+                current_element.parent_element is not None:
+            elements.append(str(current_element.name))
+            current_element = current_element.parent_element
         elements.reverse()
-        elements.append(str(self.name))
         return '.'.join(elements)
 
     @property
     def defined(self):
-        return self.value is not None or self.start_line is not None
+        return self.frozen_value is not None or self.start_line is not None
 
     def parent(self):
         return next(self.context.ancestors_iter(self))
@@ -160,8 +254,11 @@ class Element(object):
                 if isinstance(e, element_type)]
 
     def child(self, element_type):
-        matches = [e for e in self.context.child_elements_iter(self)
-                   if isinstance(e, element_type)]
+        matches = [e
+                   for child_type, child_elements
+                   in self.child_elements_by_type.iteritems()
+                   if issubclass(child_type, element_type)
+                   for e in child_elements]
         if not matches:
             raise exceptions.DSLParsingElementMatchException(
                 "No matches found for '{0}'".format(element_type))
@@ -171,17 +268,19 @@ class Element(object):
         return matches[0]
 
     def build_dict_result(self):
-        return dict((child.name, child.value)
-                    for child in self.context.child_elements_iter(self))
+        # a new dict of the frozen child values, setting its keys is fine,
+        # changing the values in place is not
+        return dict((child.name, child.frozen_value)
+                    for child in self.child_elements)
 
     def children(self):
-        return list(self.context.child_elements_iter(self))
+        return list(self.child_elements)
 
     def sibling(self, element_type):
         return self.parent().child(element_type)
 
     def validate_version(self, version, min_version):
-        if self.initial_value is not None and version < min_version:
+        if self.frozen_initial_value is not None and version < min_version:
             raise exceptions.DSLParsingLogicException(
                 exceptions.ERROR_CODE_DSL_DEFINITIONS_VERSION_MISMATCH,
                 '{0} not supported in version {1}, it was added in {2}'.format(
@@ -13,15 +13,19 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-import networkx as nx
-
-from dsl_parser import exceptions
+from dsl_parser import (exceptions,
+                        utils)
 from dsl_parser.framework import elements
-from dsl_parser.framework.requirements import Requirement
+from dsl_parser.framework.requirements import Requirement, Dependency
 
 
 class SchemaAPIValidator(object):
 
+    def __init__(self):
+        # element classes whose schema (including the schemas of the
+        # element classes it references) was already found to be valid
+        self._validated = set()
+
     def validate(self, element_cls):
         self._traverse_element_cls(element_cls)
 
@@ -31,7 +35,10 @@ class SchemaAPIValidator(object):
                 raise exceptions.DSLParsingSchemaAPIException(1)
         except TypeError:
             raise exceptions.DSLParsingSchemaAPIException(1)
+        if element_cls in self._validated:
+            return
         self._traverse_schema(element_cls.schema)
+        self._validated.add(element_cls)
 
     def _traverse_schema(self, schema, list_nesting=0):
         if isinstance(schema, dict):
@@ -66,6 +73,71 @@ class SchemaAPIValidator(object):
 
 _schema_validator = SchemaAPIValidator()
 
+_DICT_SCHEMA = 'dict'
+_DICT_TYPE_SCHEMA = 'dict_type'
+_LIST_TYPE_SCHEMA = 'list_type'
+_LEAF_SCHEMA = 'leaf'
+_UNKNOWN_SCHEMA = 'unknown'
+
+
+class CompiledSchema(object):
+    """The schema and requirements of an element class, compiled once
+    per class (after schema API validation) and shared by all parses.
+
+    ``items`` holds a ``(kind, schema)`` pair for each schema alternative,
+    ``traversal`` the context methods building the child elements of an
+    element of this class and ``requires`` the requirements of the class,
+    with string requirements converted to ``Requirement`` objects and
+    ``'self'`` resolved to the element class.
+    """
+
+    def __init__(self, element_cls):
+        schema = element_cls.schema
+        self.is_union = isinstance(schema, list)
+        self.items = []
+        self.traversal = []
+        for schema_item in schema if self.is_union else [schema]:
+            if isinstance(schema_item, dict):
+                self.items.append((_DICT_SCHEMA,
+                                   (frozenset(schema_item),
+                                    schema_item.keys())))
+                self.traversal.append((Context._traverse_dict_schema,
+                                       schema_item.items()))
+            elif isinstance(schema_item, elements.Leaf):
+                self.items.append((_LEAF_SCHEMA, schema_item.type))
+            elif isinstance(schema_item, elements.Dict):
+                self.items.append((_DICT_TYPE_SCHEMA, schema_item.type))
+                self.traversal.append((Context._traverse_dict_type_schema,
+                                       schema_item.type))
+            elif isinstance(schema_item, elements.List):
+                self.items.append((_LIST_TYPE_SCHEMA, schema_item.type))
+                self.traversal.append((Context._traverse_list_type_schema,
+                                       schema_item.type))
+            elif isinstance(schema_item, elements.UnknownSchema):
+                self.items.append((_UNKNOWN_SCHEMA, None))
+            else:
+                raise ValueError('Illegal state should have been identified'
+                                 ' by schema API validation')
+        self.requires = []
+        for required_type, requirements in element_cls.requires.items():
+            if required_type == 'self':
+                required_type = element_cls
+            self.requires.append((
+                required_type,
+                [Requirement(r) if isinstance(r, basestring) else r
+                 for r in requirements]))
+
+
+_compiled_schemas = {}
+
+
+def compiled_schema(element_cls):
+    try:
+        return _compiled_schemas[element_cls]
+    except KeyError:
+        result = _compiled_schemas[element_cls] = CompiledSchema(element_cls)
+        return result
+
 
 class Context(object):
 
@@ -76,9 +148,11 @@ class Context(object):
                  inputs):
         self.inputs = inputs or {}
         self.element_type_to_elements = {}
+        self._requirement_indexes = {}
+        self._element_positions = {}
         self._root_element = None
-        self._element_tree = nx.DiGraph()
-        self._element_graph = nx.DiGraph()
+        self._elements = []
+        self._element_graph = []
         self._traverse_element_cls(element_cls=element_cls,
                                    name=element_name,
                                    value=value,
@@ -87,26 +161,89 @@ class Context(object):
 
     @property
     def parsed_value(self):
-        return self._root_element.value if self._root_element else None
+        if not self._root_element:
+            return None
+        # the root value is not shared with any other element
+        return self._root_element.frozen_value
 
     def child_elements_iter(self, element):
-        return self._element_tree.successors_iter(element)
+        return iter(element.child_elements)
 
     def ancestors_iter(self, element):
-        current_element = element
-        while True:
-            predecessors = self._element_tree.predecessors(current_element)
-            if not predecessors:
-                return
-            if len(predecessors) > 1:
-                raise exceptions.DSLParsingFormatException(
-                    1, 'More than 1 parent found for {0}'
-                       .format(element))
-            current_element = predecessors[0]
+        current_element = element.parent_element
+        while current_element is not None:
             yield current_element
+            current_element = current_element.parent_element
 
     def descendants(self, element):
-        return nx.descendants(self._element_tree, element)
+        result = []
+        stack = [element]
+        while stack:
+            children = stack.pop().child_elements
+            result.extend(children)
+            stack.extend(children)
+        return result
+
+    def required_elements(self, element, required_type, requirements):
+        """Elements of ``required_type`` that match all ``requirements`` of
+        ``element``, in the order they were added to the context.
+
+        Requirements declaring an index narrow the candidates through a hash
+        index of the required type, predicates are evaluated for the
+        remaining candidates only.
+        """
+        required_type_elements = self.element_type_to_elements.get(
+            required_type, [])
+        candidates = None
+        for requirement in requirements:
+            if requirement.index is None:
+                continue
+            matches = self._index_lookup(element,
+                                         required_type,
+                                         requirement.index)
+            candidates = matches if candidates is None \
+                else candidates & matches
+        if candidates is not None:
+            positions = self._element_positions[required_type]
+            required_type_elements = sorted(candidates, key=positions.get)
+        predicates = [r.predicate for r in requirements
+                      if r.predicate is not None]
+        return [required_element
+                for required_element in required_type_elements
+                if all(predicate(element, required_element)
+                       for predicate in predicates)]
+
+    def _index_lookup(self, element, required_type, index):
+        key_to_elements = self._requirement_index(required_type,
+                                                  index.target_key)
+        matches = set()
+        for key in index.source_keys(element):
+            try:
+                matches.update(key_to_elements.get(key, ()))
+            except TypeError:
+                # unhashable keys (e.g. of invalid values) match nothing
+                pass
+        return matches
+
+    def _requirement_index(self, required_type, target_key):
+        key = (required_type, target_key)
+        if key not in self._requirement_indexes:
+            required_type_elements = self.element_type_to_elements.get(
+                required_type, [])
+            if required_type not in self._element_positions:
+                self._element_positions[required_type] = dict(
+                    (e, position)
+                    for position, e in enumerate(required_type_elements))
+            key_to_elements = {}
+            for required_element in required_type_elements:
+                try:
+                    key_to_elements.setdefault(
+                        target_key(required_element), []).append(
+                        required_element)
+                except TypeError:
+                    pass
+            self._requirement_indexes[key] = key_to_elements
+        return self._requirement_indexes[key]
 
     def _add_element(self, element, parent=None):
         element_type = type(element)
@@ -114,9 +251,13 @@ class Context(object):
             self.element_type_to_elements[element_type] = []
         self.element_type_to_elements[element_type].append(element)
 
-        self._element_tree.add_node(element)
+        element.element_id = len(self._elements)
+        self._elements.append(element)
         if parent:
-            self._element_tree.add_edge(parent, element)
+            element.parent_element = parent
+            parent.child_elements.append(element)
+            parent.child_elements_by_type.setdefault(
+                element_type, []).append(element)
         else:
             self._root_element = element
 
@@ -129,32 +270,15 @@ class Context(object):
                               initial_value=value,
                               context=self)
         self._add_element(element, parent=parent_element)
-        self._traverse_schema(schema=element_cls.schema,
-                              parent_element=element)
-
-    def _traverse_schema(self, schema, parent_element):
-        if isinstance(schema, dict):
-            self._traverse_dict_schema(schema=schema,
-                                       parent_element=parent_element)
-        elif isinstance(schema, elements.ElementType):
-            self._traverse_element_type_schema(
-                schema=schema,
-                parent_element=parent_element)
-        elif isinstance(schema, list):
-            self._traverse_list_schema(schema=schema,
-                                       parent_element=parent_element)
-        elif isinstance(schema, elements.UnknownSchema):
-            pass
-        else:
-            raise ValueError('Illegal state should have been identified'
-                             ' by schema API validation')
+        for traverse, schema in compiled_schema(element_cls).traversal:
+            traverse(self, schema=schema, parent_element=element)
 
-    def _traverse_dict_schema(self, schema,  parent_element):
-        if not isinstance(parent_element.initial_value, dict):
+    def _traverse_dict_schema(self, schema, parent_element):
+        if not isinstance(parent_element.initial_value_holder.value, dict):
             return
 
         parsed_names = set()
-        for name, element_cls in schema.items():
+        for name, element_cls in schema:
             if name not in parent_element.initial_value_holder:
                 value = None
             else:
@@ -172,80 +296,91 @@ class Context(object):
                                            name=k_holder, value=v_holder,
                                            parent_element=parent_element)
 
-    def _traverse_element_type_schema(self, schema, parent_element):
-        if isinstance(schema, elements.Leaf):
+    def _traverse_dict_type_schema(self, schema, parent_element):
+        if not isinstance(parent_element.initial_value_holder.value, dict):
             return
+        for name_holder, value_holder in parent_element.\
+                initial_value_holder.value.items():
+            self._traverse_element_cls(element_cls=schema,
+                                       name=name_holder,
+                                       value=value_holder,
+                                       parent_element=parent_element)
 
-        element_cls = schema.type
-        if isinstance(schema, elements.Dict):
-            if not isinstance(parent_element.initial_value, dict):
-                return
-            for name_holder, value_holder in parent_element.\
-                    initial_value_holder.value.items():
-                self._traverse_element_cls(element_cls=element_cls,
-                                           name=name_holder,
-                                           value=value_holder,
-                                           parent_element=parent_element)
-        elif isinstance(schema, elements.List):
-            if not isinstance(parent_element.initial_value, list):
-                return
-            for index, value_holder in enumerate(
-                    parent_element.initial_value_holder.value):
-                self._traverse_element_cls(element_cls=element_cls,
-                                           name=index,
-                                           value=value_holder,
-                                           parent_element=parent_element)
-        else:
-            raise ValueError('Illegal state should have been identified'
-                             ' by schema API validation')
-
-    def _traverse_list_schema(self, schema, parent_element):
-        for schema_item in schema:
-            self._traverse_schema(schema=schema_item,
-                                  parent_element=parent_element)
+    def _traverse_list_type_schema(self, schema, parent_element):
+        if not isinstance(parent_element.initial_value_holder.value, list):
+            return
+        for index, value_holder in enumerate(
+                parent_element.initial_value_holder.value):
+            self._traverse_element_cls(element_cls=schema,
+                                       name=index,
+                                       value=value_holder,
+                                       parent_element=parent_element)
 
     def _calculate_element_graph(self):
-        self.element_graph = nx.DiGraph(self._element_tree)
+        # the element graph is kept as adjacency lists indexed by element id,
+        # an edge from a to b means a must be processed before b, i.e. an
+        # element is processed after its children and after the elements it
+        # requires
+        element_graph = [[] for _ in self._elements]
+        for element in self._elements:
+            if element.parent_element is not None:
+                element_graph[element.element_id].append(
+                    element.parent_element.element_id)
         for element_type, _elements in self.element_type_to_elements.items():
-            requires = element_type.requires
-            for requirement, requirement_values in requires.items():
-                requirement_values = [
-                    Requirement(r) if isinstance(r, basestring)
-                    else r for r in requirement_values]
+            requires = compiled_schema(element_type).requires
+            for requirement, requirement_values in requires:
                 if requirement == 'inputs':
                     continue
-                if requirement == 'self':
-                    requirement = element_type
-                dependencies = self.element_type_to_elements.get(
-                    requirement, [])
-                for dependency in dependencies:
-                    for element in _elements:
-                        predicates = [r.predicate for r in requirement_values
-                                      if r.predicate is not None]
-                        add_dependency = not predicates or all([
-                            predicate(element, dependency)
-                            for predicate in predicates])
-                        if add_dependency:
-                            self.element_graph.add_edge(element, dependency)
-        # we reverse the graph because only netorkx 1.9.1 has the reverse
-        # flag in the topological sort function, it is only used by it
-        # so this should be good
-        self.element_graph.reverse(copy=False)
+                for element in _elements:
+                    for dependency in self.required_elements(
+                            element, requirement, requirement_values):
+                        element_graph[dependency.element_id].append(
+                            element.element_id)
+        self._element_graph = element_graph
 
     def elements_graph_topological_sort(self):
-        try:
-            return nx.topological_sort(self.element_graph)
-        except nx.NetworkXUnfeasible:
-            # Cycle detected
-            cycle = nx.recursive_simple_cycles(self.element_graph)[0]
-            names = [str(e.name) for e in cycle]
-            names.append(str(names[0]))
-            ex = exceptions.DSLParsingLogicException(
-                exceptions.ERROR_CODE_CYCLE,
-                'Parsing failed. Circular dependency detected: {0}'
-                .format(' --> '.join(names)))
-            ex.circular_dependency = names
-            raise ex
+        element_graph = self._element_graph
+        seen = set()
+        explored = set()
+        order = []
+        for element_id in xrange(len(element_graph)):
+            if element_id in explored:
+                continue
+            fringe = [element_id]
+            while fringe:
+                current_id = fringe[-1]
+                if current_id in explored:
+                    fringe.pop()
+                    continue
+                seen.add(current_id)
+                new_ids = []
+                for next_id in element_graph[current_id]:
+                    if next_id not in explored:
+                        if next_id in seen:
+                            self._raise_cycle_error()
+                        new_ids.append(next_id)
+                if new_ids:
+                    fringe.extend(new_ids)
+                else:
+                    explored.add(current_id)
+                    order.append(current_id)
+                    fringe.pop()
+        order.reverse()
+        return [self._elements[element_id] for element_id in order]
+
+    def _raise_cycle_error(self):
+        element_graph = self._element_graph
+        cycle = [self._elements[element_id] for element_id in
+                 utils.find_cycle(xrange(len(element_graph)),
+                                  element_graph.__getitem__)]
+        names = [str(e.name) for e in cycle]
+        names.append(str(names[0]))
+        ex = exceptions.DSLParsingLogicException(
+            exceptions.ERROR_CODE_CYCLE,
+            'Parsing failed. Circular dependency detected: {0}'
+            .format(' --> '.join(names)))
+        ex.circular_dependency = names
+        raise ex
 
 
 class Parser(object):
@@ -273,14 +408,14 @@ class Parser(object):
 
     @staticmethod
     def _validate_element_schema(element, strict):
-        value = element.initial_value
+        value = element.frozen_initial_value
         if element.required and value is None:
             raise exceptions.DSLParsingFormatException(
                 1, "'{0}' key is required but it is currently missing"
                    .format(element.name))
 
-        def validate_schema(schema):
-            if isinstance(schema, (dict, elements.Dict)):
+        def validate_schema(kind, schema):
+            if kind in (_DICT_SCHEMA, _DICT_TYPE_SCHEMA):
                 if not isinstance(value, dict):
                     raise exceptions.DSLParsingFormatException(
                         1, _expected_type_message(value, dict))
@@ -291,35 +426,35 @@ class Parser(object):
                                " found '{0}' of type '{1}'"
                                .format(key, _py_type_to_user_type(type(key))))
 
-            if strict and isinstance(schema, dict):
+            if strict and kind == _DICT_SCHEMA:
+                schema_keys, schema_key_names = schema
                 for key in value.keys():
-                    if key not in schema:
+                    if key not in schema_keys:
                         ex = exceptions.DSLParsingFormatException(
                             1, "'{0}' is not in schema. "
                                "Valid schema values: {1}"
-                               .format(key, schema.keys()))
+                               .format(key, schema_key_names))
                         for child_element in element.children():
                             if child_element.name == key:
                                 ex.element = child_element
                                 break
                         raise ex
 
-            if (isinstance(schema, elements.List) and
-                    not isinstance(value, list)):
+            if kind == _LIST_TYPE_SCHEMA and not isinstance(value, list):
                 raise exceptions.DSLParsingFormatException(
                     1, _expected_type_message(value, list))
 
-            if (isinstance(schema, elements.Leaf) and
-                    not isinstance(value, schema.type)):
+            if kind == _LEAF_SCHEMA and not isinstance(value, schema):
                 raise exceptions.DSLParsingFormatException(
-                    1, _expected_type_message(value, schema.type))
+                    1, _expected_type_message(value, schema))
         if value is not None:
-            if isinstance(element.schema, list):
+            element_schema = compiled_schema(type(element))
+            if element_schema.is_union:
                 validated = False
                 last_error = None
-                for schema_item in element.schema:
+                for kind, schema_item in element_schema.items:
                     try:
-                        validate_schema(schema_item)
+                        validate_schema(kind, schema_item)
                     except exceptions.DSLParsingFormatException as e:
                         last_error = e
                     else:
@@ -332,7 +467,7 @@ class Parser(object):
                     else:
                         raise last_error
             else:
-                validate_schema(element.schema)
+                validate_schema(*element_schema.items[0])
 
     def _process_element(self, element):
         required_args = self._extract_element_requirements(element)
@@ -344,9 +479,8 @@ class Parser(object):
     def _extract_element_requirements(element):
         context = element.context
         required_args = {}
-        for required_type, requirements in element.requires.items():
-            requirements = [Requirement(r) if isinstance(r, basestring)
-                            else r for r in requirements]
+        requires = compiled_schema(type(element)).requires
+        for required_type, requirements in requires:
             if not requirements:
                 # only set required type as a logical dependency
                 pass
@@ -359,22 +493,19 @@ class Parser(object):
                                .format(input.name, context.inputs.keys()))
                     required_args[input.name] = context.inputs.get(input.name)
             else:
-                if required_type == 'self':
-                    required_type = type(element)
-                required_type_elements = context.element_type_to_elements.get(
-                    required_type, [])
                 for requirement in requirements:
+                    if isinstance(requirement, Dependency):
+                        continue
+                    # required values are passed on frozen, elements
+                    # copy what they change
                     result = []
-                    for required_element in required_type_elements:
-                        if requirement.predicate and not requirement.predicate(
-                                element, required_element):
-                            continue
+                    for required_element in context.required_elements(
+                            element, required_type, [requirement]):
                         if requirement.parsed:
-                            result.append(required_element.value)
+                            result.append(required_element.frozen_value)
                         else:
-                            if (requirement.name not in
-                                    required_element.provided):
-                                provided = required_element.provided.keys()
+                            provided = required_element.frozen_provided
+                            if requirement.name not in provided:
                                 if requirement.required:
                                     raise exceptions.DSLParsingFormatException(
                                         1,
@@ -383,11 +514,10 @@ class Parser(object):
                                         "are: {2}"
                                         .format(requirement.name,
                                                 required_element.name,
-                                                provided))
+                                                provided.keys()))
                                 else:
                                     continue
-                            result.append(required_element.provided[
-                                requirement.name])
+                            result.append(provided[requirement.name])
 
                     if len(result) != 1 and not requirement.multiple_results:
                         if requirement.required:
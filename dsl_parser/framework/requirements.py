@@ -21,12 +21,14 @@ class Requirement(object):
                  parsed=False,
                  multiple_results=False,
                  required=True,
-                 predicate=None):
+                 predicate=None,
+                 index=None):
         self.name = name
         self.parsed = parsed
         self.multiple_results = multiple_results
         self.required = required
         self.predicate = predicate
+        self.index = index
 
 
 class Value(Requirement):
@@ -35,13 +37,71 @@ class Value(Requirement):
                  name,
                  multiple_results=False,
                  required=True,
-                 predicate=None):
+                 predicate=None,
+                 index=None):
         super(Value, self).__init__(name,
                                     parsed=True,
                                     multiple_results=multiple_results,
                                     required=required,
-                                    predicate=predicate)
+                                    predicate=predicate,
+                                    index=index)
+
+
+class Dependency(Requirement):
+    """
+    Logical dependency on the elements of the required type matching the
+    predicate and/or index. Unlike other requirements, no value is passed
+    to the requiring element. (an empty requirements list is a logical
+    dependency on all elements of the required type)
+    """
+
+    def __init__(self,
+                 predicate=None,
+                 index=None):
+        super(Dependency, self).__init__(None,
+                                         multiple_results=True,
+                                         required=False,
+                                         predicate=predicate,
+                                         index=index)
+
+
+class Index(object):
+    """
+    Hash index used to find the elements a requirement may match without
+    evaluating its predicate against every element of the required type.
+
+    ``target_key`` maps an element of the required type to a key, and is
+    evaluated once per element. ``source_keys`` maps the requiring element
+    to the keys it depends on. Only elements whose key is one of the source
+    keys are candidates; if the requirement has a predicate as well, it is
+    then evaluated for the candidates only.
+    """
+
+    def __init__(self, source_keys, target_key=None):
+        self.source_keys = source_keys
+        self.target_key = target_key or element_name
+
+
+def element_name(element):
+    return element.name
+
+
+def element_parent(element):
+    return element.parent()
 
 
 def sibling_predicate(source, target):
     return source.parent() == target.parent()
+
+
+def name_index(source_key):
+    """Index of the element named by ``source_key(source)``, a ``None``
+    source key matches no element."""
+    def source_keys(source):
+        key = source_key(source)
+        return [] if key is None else [key]
+    return Index(source_keys)
+
+
+sibling_index = Index(source_keys=lambda source: [source.parent()],
+                      target_key=element_parent)
@@ -15,6 +15,7 @@
 
 import pkg_resources
 import abc
+import collections
 
 from dsl_parser import (constants,
                         exceptions,
@@ -57,14 +58,22 @@ class RuntimeEvaluationStorage(object):
     def __init__(self,
                  get_node_instances_method,
                  get_node_instance_method,
-                 get_node_method):
+                 get_node_method,
+                 get_node_instances_bulk_method=None,
+                 get_nodes_bulk_method=None,
+                 runtime_cache=None):
         self._get_node_instances_method = get_node_instances_method
         self._get_node_instance_method = get_node_instance_method
         self._get_node_method = get_node_method
+        self._get_node_instances_bulk_method = get_node_instances_bulk_method
+        self._get_nodes_bulk_method = get_nodes_bulk_method
+        self._runtime_cache = runtime_cache
 
         self._node_to_node_instances = {}
         self._node_instances = {}
         self._nodes = {}
+        self._ancestry = {}
+        self._group_node_instances = {}
 
     def get_node_instances(self, node_id):
         if node_id not in self._node_to_node_instances:
@@ -76,16 +85,131 @@ class RuntimeEvaluationStorage(object):
 
     def get_node_instance(self, node_instance_id):
         if node_instance_id not in self._node_instances:
-            node_instance = self._get_node_instance_method(node_instance_id)
+            if self._runtime_cache is None:
+                node_instance = self._get_node_instance_method(
+                    node_instance_id)
+            else:
+                node_instance = self._runtime_cache.get_node_instance(
+                    node_instance_id, self._get_node_instance_method)
             self._node_instances[node_instance_id] = node_instance
         return self._node_instances[node_instance_id]
 
     def get_node(self, node_id):
         if node_id not in self._nodes:
-            node = self._get_node_method(node_id)
+            if self._runtime_cache is None:
+                node = self._get_node_method(node_id)
+            else:
+                node = self._runtime_cache.get_node(node_id,
+                                                    self._get_node_method)
             self._nodes[node_id] = node
         return self._nodes[node_id]
 
+    def get_ancestry(self, node_instance_id):
+        """Returns the scaling groups a node instance is contained in,
+        either directly or through its contained_in ancestors.
+
+        The result is a (containing groups, group instances) tuple where
+        containing groups is a list of the group names, closest first, and
+        group instances maps each group name to the id of the (closest)
+        group instance containing the node instance. Ancestry is computed
+        once per node instance and shared with its descendants.
+        """
+        if node_instance_id not in self._ancestry:
+            node_instance = self.get_node_instance(node_instance_id)
+            scaling_groups = node_instance.scaling_groups or []
+            parent_instance = self._parent_instance(node_instance)
+            if parent_instance:
+                parent_groups, parent_group_instances = self.get_ancestry(
+                    parent_instance.id)
+            else:
+                parent_groups, parent_group_instances = [], {}
+            containing_groups = [g['name'] for g in scaling_groups] + \
+                parent_groups
+            group_instances = dict(parent_group_instances)
+            # the first occurrence of a group in the instance wins
+            for scaling_group in reversed(scaling_groups):
+                group_instances[scaling_group['name']] = scaling_group['id']
+            self._ancestry[node_instance_id] = (containing_groups,
+                                                group_instances)
+        return self._ancestry[node_instance_id]
+
+    def get_group_node_instances(self, node_id, group_name,
+                                 group_instance_id):
+        """Returns the instances of ``node_id`` contained in the group
+        instance ``group_instance_id`` of scaling group ``group_name``.
+        """
+        key = (node_id, group_name)
+        if key not in self._group_node_instances:
+            group_node_instances = {}
+            for node_instance in self.get_node_instances(node_id):
+                _, group_instances = self.get_ancestry(node_instance.id)
+                if group_name not in group_instances:
+                    raise RuntimeError('Illegal state')
+                group_node_instances.setdefault(
+                    group_instances[group_name], []).append(node_instance)
+            self._group_node_instances[key] = group_node_instances
+        return self._group_node_instances[key].get(group_instance_id, [])
+
+    def _parent_instance(self, node_instance):
+        node = self.get_node(node_instance.node_id)
+        for relationship in node.relationships or []:
+            if constants.CONTAINED_IN_REL_TYPE in \
+                    relationship['type_hierarchy']:
+                target_name = relationship['target_id']
+                target_id = [
+                    r['target_id'] for r in node_instance.relationships
+                    if r['target_name'] == target_name][0]
+                return self.get_node_instance(target_id)
+        return None
+
+    def prefetch(self, node_ids, node_instance_ids):
+        """Fetch the node instances of ``node_ids``, the node instances
+        ``node_instance_ids`` and the nodes of all of these (along with the
+        nodes they have relationships to) with a single call to each of the
+        bulk methods, if provided.
+
+        The bulk methods are called with keyword arguments:
+        ``get_node_instances_bulk_method(node_ids, node_instance_ids)``
+        should return all the instances of ``node_ids`` as well as the
+        node instances ``node_instance_ids`` and
+        ``get_nodes_bulk_method(node_ids)`` should return the nodes
+        ``node_ids``. Anything not fetched here is later fetched one at a
+        time, as before.
+        """
+        node_ids = set(node_id for node_id in node_ids
+                       if node_id not in self._node_to_node_instances)
+        node_instance_ids = set(
+            node_instance_id for node_instance_id in node_instance_ids
+            if node_instance_id not in self._node_instances)
+        node_instances = []
+        if self._get_node_instances_bulk_method and \
+                (node_ids or node_instance_ids):
+            node_instances = self._get_node_instances_bulk_method(
+                node_ids=list(node_ids),
+                node_instance_ids=list(node_instance_ids))
+            node_to_node_instances = dict(
+                (node_id, []) for node_id in node_ids)
+            fetched_ids = set()
+            for node_instance in node_instances:
+                if node_instance.id in fetched_ids:
+                    continue
+                fetched_ids.add(node_instance.id)
+                self._node_instances[node_instance.id] = node_instance
+                if node_instance.node_id in node_to_node_instances:
+                    node_to_node_instances[node_instance.node_id].append(
+                        node_instance)
+            self._node_to_node_instances.update(node_to_node_instances)
+        if self._get_nodes_bulk_method:
+            for node_instance in node_instances:
+                node_ids.add(node_instance.node_id)
+                for relationship in node_instance.relationships or []:
+                    node_ids.add(relationship['target_name'])
+            node_ids = [node_id for node_id in node_ids
+                        if node_id not in self._nodes]
+            if node_ids:
+                for node in self._get_nodes_bulk_method(node_ids=node_ids):
+                    self._nodes[node.id] = node
+
 
 class Function(object):
 
@@ -181,17 +305,13 @@ class GetProperty(Function):
                 node = self.context['node_template']
             else:
                 target_node = self.context['relationship']['target_id']
-                node = [
-                    x for x in plan.node_templates
-                    if x['name'] == target_node][0]
+                node = plan.node_templates_by_name[target_node]
         else:
-            found = [
-                x for x in plan.node_templates if self.node_name == x['id']]
-            if len(found) == 0:
+            node = _get_node_template(plan, self.node_name)
+            if node is None:
                 raise KeyError(
                     "{0} function node reference '{1}' does not exist.".format(
                         self.name, self.node_name))
-            node = found[0]
         self._get_property_value(node)
         return node
 
@@ -247,9 +367,7 @@ class GetAttribute(Function):
                                            self.name,
                                            self.path))
         if self.node_name not in [SELF, SOURCE, TARGET]:
-            found = [
-                x for x in plan.node_templates if self.node_name == x['id']]
-            if not found:
+            if _get_node_template(plan, self.node_name) is None:
                 raise KeyError(
                     "{0} function node reference '{1}' does not exist.".format(
                         self.name, self.node_name))
@@ -347,28 +465,9 @@ class GetAttribute(Function):
             storage,
             node_instances):
 
-        def _parent_instance(_instance):
-            _node = storage.get_node(_instance.node_id)
-            for relationship in _node.relationships or []:
-                if (constants.CONTAINED_IN_REL_TYPE in
-                        relationship['type_hierarchy']):
-                    target_name = relationship['target_id']
-                    target_id = [
-                        r['target_id'] for r in _instance.relationships
-                        if r['target_name'] == target_name][0]
-                    return storage.get_node_instance(target_id)
-            return None
-
-        def _containing_groups(_instance):
-            result = [g['name'] for g in _instance.scaling_groups or []]
-            parent_instance = _parent_instance(_instance)
-            if parent_instance:
-                result += _containing_groups(parent_instance)
-            return result
-
         def _minimal_shared_group(instance_a, instance_b):
-            a_containing_groups = _containing_groups(instance_a)
-            b_containing_groups = _containing_groups(instance_b)
+            a_containing_groups, _ = storage.get_ancestry(instance_a.id)
+            b_containing_groups, _ = storage.get_ancestry(instance_b.id)
             shared_groups = set(a_containing_groups) & set(b_containing_groups)
             if not shared_groups:
                 return None
@@ -379,13 +478,10 @@ class GetAttribute(Function):
                 raise RuntimeError('Illegal state')
 
         def _group_instance(node_instance, group_name):
-            for scaling_group in (node_instance.scaling_groups or []):
-                if scaling_group['name'] == group_name:
-                    return scaling_group['id']
-            parent_instance = _parent_instance(node_instance)
-            if not parent_instance:
+            _, group_instances = storage.get_ancestry(node_instance.id)
+            if group_name not in group_instances:
                 raise RuntimeError('Illegal state')
-            return _group_instance(parent_instance, group_name)
+            return group_instances[group_name]
 
         def _resolve_node_instance(context_instance_id):
             context_instance = storage.get_node_instance(context_instance_id)
@@ -396,10 +492,8 @@ class GetAttribute(Function):
 
             context_group_instance = _group_instance(context_instance,
                                                      minimal_shared_group)
-            result_node_instances = [
-                i for i in node_instances if
-                _group_instance(i, minimal_shared_group) ==
-                context_group_instance]
+            result_node_instances = storage.get_group_node_instances(
+                self.node_name, minimal_shared_group, context_group_instance)
 
             if len(result_node_instances) == 1:
                 return result_node_instances[0]
@@ -473,6 +567,14 @@ class Concat(Function):
         return self.separator.join(str_join)
 
 
+def _get_node_template(plan, node_id):
+    try:
+        return plan.node_templates_by_id.get(node_id)
+    except TypeError:
+        # unhashable node reference
+        return None
+
+
 def _get_property_value(node_name,
                         properties,
                         property_path,
@@ -540,6 +642,10 @@ def parse(raw_function, scope=None, context=None, path=None):
         func_name = raw_function.keys()[0]
         if func_name in TEMPLATE_FUNCTIONS:
             func_args = raw_function.values()[0]
+            if isinstance(path, scan.LazyPath):
+                # scans only format paths when a function call is found,
+                # functions (including registered ones) get a plain string
+                path = str(path)
             return TEMPLATE_FUNCTIONS[func_name](func_args,
                                                  scope=scope,
                                                  context=context,
@@ -551,7 +657,10 @@ def parse(raw_function, scope=None, context=None, path=None):
 def evaluate_functions(payload, context,
                        get_node_instances_method,
                        get_node_instance_method,
-                       get_node_method):
+                       get_node_method,
+                       get_node_instances_bulk_method=None,
+                       get_nodes_bulk_method=None,
+                       runtime_cache=None):
     """Evaluate functions in payload.
 
     :param payload: The payload to evaluate.
@@ -559,30 +668,57 @@ def evaluate_functions(payload, context,
     :param get_node_instances_method: A method for getting node instances.
     :param get_node_instance_method: A method for getting a node instance.
     :param get_node_method: A method for getting a node.
+    :param get_node_instances_bulk_method: An optional method for getting
+                                           the node instances referenced
+                                           by the payload in one call.
+    :param get_nodes_bulk_method: An optional method for getting the nodes
+                                  referenced by the payload in one call.
+    :param runtime_cache: An optional cache, shared across evaluations, to
+                          get nodes and node instances from (see
+                          ``runtime_cache.RuntimeEvaluationCache``).
     :return: payload.
     """
-    handler = runtime_evaluation_handler(get_node_instances_method,
-                                         get_node_instance_method,
-                                         get_node_method)
+    storage = RuntimeEvaluationStorage(
+        get_node_instances_method=get_node_instances_method,
+        get_node_instance_method=get_node_instance_method,
+        get_node_method=get_node_method,
+        get_node_instances_bulk_method=get_node_instances_bulk_method,
+        get_nodes_bulk_method=get_nodes_bulk_method,
+        runtime_cache=runtime_cache)
+    if get_node_instances_bulk_method or get_nodes_bulk_method:
+        storage.prefetch(*get_runtime_references(payload, context))
+    handler = _handler('evaluate_runtime', storage=storage)
     scan.scan_properties(payload,
                          handler,
                          scope=None,
                          context=context,
                          path='payload',
-                         replace=True)
+                         replace=True,
+                         lazy_path=True)
     return payload
 
 
 def evaluate_outputs(outputs_def,
                      get_node_instances_method,
                      get_node_instance_method,
-                     get_node_method):
+                     get_node_method,
+                     get_node_instances_bulk_method=None,
+                     get_nodes_bulk_method=None,
+                     runtime_cache=None):
     """Evaluates an outputs definition containing intrinsic functions.
 
     :param outputs_def: Outputs definition.
     :param get_node_instances_method: A method for getting node instances.
     :param get_node_instance_method: A method for getting a node instance.
     :param get_node_method: A method for getting a node.
+    :param get_node_instances_bulk_method: An optional method for getting
+                                           the node instances referenced
+                                           by the outputs in one call.
+    :param get_nodes_bulk_method: An optional method for getting the nodes
+                                  referenced by the outputs in one call.
+    :param runtime_cache: An optional cache, shared across evaluations, to
+                          get nodes and node instances from (see
+                          ``runtime_cache.RuntimeEvaluationCache``).
     :return: Outputs dict.
     """
     outputs = dict((k, v['value']) for k, v in outputs_def.iteritems())
@@ -591,7 +727,49 @@ def evaluate_outputs(outputs_def,
         context={},
         get_node_instances_method=get_node_instances_method,
         get_node_instance_method=get_node_instance_method,
-        get_node_method=get_node_method)
+        get_node_method=get_node_method,
+        get_node_instances_bulk_method=get_node_instances_bulk_method,
+        get_nodes_bulk_method=get_nodes_bulk_method,
+        runtime_cache=runtime_cache)
+
+
+def get_runtime_references(payload, context):
+    """Collect the node ids and node instance ids the get_attribute
+    functions in ``payload`` refer to, directly or through ``context``.
+
+    This allows callers to fetch everything an evaluation needs up front
+    (e.g. concurrently, from an asynchronous storage) and hand it to
+    ``evaluate_functions`` through the bulk methods, so that evaluation
+    itself only falls back to the per-id methods for contained_in
+    ancestors of the referenced node instances.
+
+    :param payload: The payload that is about to be evaluated.
+    :param context: Context that will be used during evaluation.
+    :return: A (node ids, node instance ids) tuple of sets.
+    """
+    node_ids = set()
+    node_instance_ids = set()
+
+    def handler(v, scope, context, path):
+        func = parse(v, scope=scope, context=context, path=path)
+        if isinstance(func, GetAttribute):
+            if isinstance(func.node_name, basestring) and \
+                    func.node_name not in [SELF, SOURCE, TARGET]:
+                node_ids.add(func.node_name)
+            # context instances are also used for resolving named
+            # references to nodes with more than one instance
+            for ref in ['self', 'source', 'target']:
+                if context.get(ref):
+                    node_instance_ids.add(context[ref])
+        return v
+
+    scan.scan_properties(payload,
+                         handler,
+                         scope=None,
+                         context=context,
+                         path='payload',
+                         lazy_path=True)
+    return node_ids, node_instance_ids
 
 
 def _handler(evaluator, **evaluator_kwargs):
@@ -614,14 +792,95 @@ def _handler(evaluator, **evaluator_kwargs):
                                  scope=scope,
                                  context=context,
                                  path=path,
-                                 replace=True)
+                                 replace=True,
+                                 lazy_path=True)
             scanned = True
         return evaluated_value
     return handler
 
 
+class _PlanEvaluationHandler(object):
+    """Scan handler evaluating the functions of a plan.
+
+    Properties referenced by get_property functions are fully resolved,
+    in the context of the node template they belong to, once per
+    evaluation and memoized by (node id, property path). ``memo_hits``
+    counts the get_property functions that were served from the memo.
+    """
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.memo = {}
+        self.memo_hits = 0
+        self._resolving = []
+
+    def __call__(self, v, scope, context, path):
+        evaluated_value = v
+        scanned = False
+        while True:
+            func = parse(evaluated_value,
+                         scope=scope,
+                         context=context,
+                         path=path)
+            if not isinstance(func, Function):
+                break
+            if isinstance(func, GetProperty):
+                return self._evaluate_get_property(func)
+            previous_evaluated_value = evaluated_value
+            evaluated_value = func.evaluate(self.plan)
+            if scanned and previous_evaluated_value == evaluated_value:
+                break
+            scan.scan_properties(evaluated_value,
+                                 self,
+                                 scope=scope,
+                                 context=context,
+                                 path=path,
+                                 replace=True,
+                                 lazy_path=True)
+            scanned = True
+        return evaluated_value
+
+    def _evaluate_get_property(self, func):
+        node_template = func.get_node_template(self.plan)
+        key = (node_template['name'], tuple(func.property_path))
+        try:
+            if key in self.memo:
+                self.memo_hits += 1
+                return self.memo[key]
+        except TypeError:
+            # unhashable property path, evaluating it raises a proper error
+            return func.evaluate(self.plan)
+        if key in self._resolving:
+            cycle = self._resolving[self._resolving.index(key):] + [key]
+            raise RuntimeError(
+                'Circular get_property function call detected: '
+                '{0}'.format(' -> '.join(
+                    '{0}.{1}'.format(name, ','.join(str(p) for p in path))
+                    for name, path in cycle)))
+        self._resolving.append(key)
+        try:
+            path = '{0}.properties.{1}'.format(
+                node_template['name'],
+                '.'.join(str(p) for p in func.property_path))
+            value = self(func.evaluate(self.plan),
+                         scan.NODE_TEMPLATE_SCOPE,
+                         node_template,
+                         path)
+            scan.scan_properties(value,
+                                 self,
+                                 scope=scan.NODE_TEMPLATE_SCOPE,
+                                 context=node_template,
+                                 path=path,
+                                 replace=True,
+                                 lazy_path=True)
+        finally:
+            self._resolving.pop()
+        self.memo[key] = value
+        return value
+
+
 def plan_evaluation_handler(plan):
-    return _handler('evaluate', plan=plan)
+    return _PlanEvaluationHandler(plan)
 
 
 def runtime_evaluation_handler(get_node_instances_method,
@@ -634,6 +893,12 @@ def runtime_evaluation_handler(get_node_instances_method,
                         get_node_method=get_node_method))
 
 
+def is_function(value):
+    return (isinstance(value, dict) and
+            len(value) == 1 and
+            value.keys()[0] in TEMPLATE_FUNCTIONS)
+
+
 def validate_functions(plan):
     get_property_functions = []
 
@@ -646,44 +911,24 @@ def validate_functions(plan):
             return _func
         return v
 
+    # Mark the containers holding function calls, so that the scans made
+    # here skip function free values. Markers only apply to the plan as it
+    # is now, the deployment plan is prepared using the function sites
+    # index, which is checked against the plan before it is used
+    markers = scan.mark_service_template(plan, is_function)
+    plan[constants.FUNCTION_SITES] = scan.find_function_sites(
+        plan, is_function, markers)
+
     # Replace all get_property functions with their instance representation
-    scan.scan_service_template(plan, handler, replace=True)
+    scan.scan_service_template(plan, handler, replace=True,
+                               lazy_path=True,
+                               markers=markers)
 
     if not get_property_functions:
         return
 
     # Validate there are no circular get_property calls
-    for func in get_property_functions:
-        property_path = [str(prop) for prop in func.property_path]
-        visited_functions = ['{0}.{1}'.format(
-            func.get_node_template(plan)['name'],
-            constants.FUNCTION_NAME_PATH_SEPARATOR.join(property_path))]
-
-        def validate_no_circular_get_property(*args):
-            r = args[0]
-            if isinstance(r, GetProperty):
-                func_id = '{0}.{1}'.format(
-                    r.get_node_template(plan)['name'],
-                    constants.FUNCTION_NAME_PATH_SEPARATOR.join(
-                        r.property_path))
-                if func_id in visited_functions:
-                    visited_functions.append(func_id)
-                    error_output = [
-                        x.replace(constants.FUNCTION_NAME_PATH_SEPARATOR, ',')
-                        for x in visited_functions
-                    ]
-                    raise RuntimeError(
-                        'Circular get_property function call detected: '
-                        '{0}'.format(' -> '.join(error_output)))
-                visited_functions.append(func_id)
-                r = r.evaluate(plan)
-                validate_no_circular_get_property(r)
-            else:
-                scan.scan_properties(
-                    r, validate_no_circular_get_property, recursive=False)
-
-        result = func.evaluate(plan)
-        validate_no_circular_get_property(result)
+    _validate_no_circular_get_property(plan, get_property_functions)
 
     def replace_with_raw_function(*args):
         if isinstance(args[0], GetProperty):
@@ -691,4 +936,69 @@ def validate_functions(plan):
         return args[0]
 
     # Change previously replaced get_property instances with raw values
-    scan.scan_service_template(plan, replace_with_raw_function, replace=True)
+    scan.scan_service_template(plan, replace_with_raw_function, replace=True,
+                               lazy_path=True,
+                               markers=markers)
+
+
+def _validate_no_circular_get_property(plan, get_property_functions):
+    """Build a graph of the properties referenced by get_property functions,
+    where each property depends on the properties referenced from its
+    value, and look for a cycle in it (see ``utils.find_cycle``).
+
+    Every referenced property is evaluated once, no matter how many
+    functions reference it.
+    """
+    # the properties referenced from the value of each property, every
+    # referenced property is evaluated too, so all of them have an entry
+    successors = {}
+    evaluated = set()
+    # property ids in the order they were first referenced
+    func_ids = []
+    pending = collections.deque(get_property_functions)
+    while pending:
+        func = pending.popleft()
+        func_id = _get_property_function_id(func, plan)
+        if func_id in evaluated:
+            continue
+        evaluated.add(func_id)
+        func_ids.append(func_id)
+        successors[func_id] = []
+        for referenced in _referenced_get_property_functions(
+                func.evaluate(plan)):
+            successors[func_id].append(_get_property_function_id(
+                referenced, plan))
+            pending.append(referenced)
+
+    # imported here, as utils depends on this module
+    from dsl_parser import utils
+    # report the cycle through the first property that is part of one
+    cycle = utils.find_cycle(func_ids, successors.__getitem__)
+    if cycle is None:
+        return
+    cycle.append(cycle[0])
+    error_output = [x.replace(constants.FUNCTION_NAME_PATH_SEPARATOR, ',')
+                    for x in cycle]
+    raise RuntimeError(
+        'Circular get_property function call detected: '
+        '{0}'.format(' -> '.join(error_output)))
+
+
+def _get_property_function_id(func, plan):
+    property_path = [str(prop) for prop in func.property_path]
+    return '{0}.{1}'.format(
+        func.get_node_template(plan)['name'],
+        constants.FUNCTION_NAME_PATH_SEPARATOR.join(property_path))
+
+
+def _referenced_get_property_functions(value):
+    if isinstance(value, GetProperty):
+        return [value]
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, list):
+        return []
+    referenced = []
+    for item in value:
+        referenced.extend(_referenced_get_property_functions(item))
+    return referenced
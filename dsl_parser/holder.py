@@ -16,6 +16,16 @@
 
 class Holder(object):
 
+    # a merged blueprint wraps every key, value and container in a holder,
+    # so avoid a per instance __dict__
+    __slots__ = ('value',
+                 'start_line',
+                 'start_column',
+                 'end_line',
+                 'end_column',
+                 'filename',
+                 '_key_index')
+
     def __init__(self,
                  value,
                  start_line=None,
@@ -29,6 +39,7 @@ class Holder(object):
         self.end_line = end_line
         self.end_column = end_column
         self.filename = filename
+        self._key_index = None
 
     def __str__(self):
         return '{0}<{1}.{2}-{3}.{4} [{5}]>'.format(
@@ -53,14 +64,40 @@ class Holder(object):
         return value_holder is not None
 
     def get_item(self, key):
+        self._validate_dict()
+        try:
+            key_holder = self._keys().get(key)
+        except TypeError:
+            # unhashable key
+            return None, None
+        if key_holder is None:
+            return None, None
+        return key_holder, self.value[key_holder]
+
+    def set_item(self, key_holder, value_holder):
+        """Set ``key_holder`` to ``value_holder`` in this dict holder, keeping
+        the key index up to date."""
+        self._validate_dict()
+        keys = self._keys()
+        self.value[key_holder] = value_holder
+        keys.setdefault(key_holder.value, key_holder)
+
+    def _keys(self):
+        # raw key -> key holder, rebuilt whenever the dict is replaced or
+        # was changed without going through set_item
+        index = self._key_index
+        if (index is None or index[0] is not self.value or
+                len(index[1]) != len(self.value)):
+            keys = dict((key_holder.value, key_holder)
+                        for key_holder in self.value)
+            index = self._key_index = (self.value, keys)
+        return index[1]
+
+    def _validate_dict(self):
         if not isinstance(self.value, dict):
             raise ValueError('Value is expected to be of type dict while it'
                              'is in fact of type {0}'
                              .format(type(self.value).__name__))
-        for key_holder, value_holder in self.value.iteritems():
-            if key_holder.value == key:
-                return key_holder, value_holder
-        return None, None
 
     def restore(self):
         if isinstance(self.value, dict):
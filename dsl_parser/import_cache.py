@@ -0,0 +1,371 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import abc
+import errno
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import urllib
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+from dsl_parser import (holder,
+                        utils)
+
+DEFAULT_MAX_SIZE_BYTES = 64 * 1024 * 1024
+
+# bump whenever the on disk holder encoding changes
+DISK_FORMAT_VERSION = 1
+
+_SCALAR = 0
+_DICT = 1
+_LIST = 2
+_SET = 3
+
+
+class AbstractImportCache(object):
+    """
+    This class is abstract and should be inherited by concrete
+    implementations of an import cache.
+
+    An import cache stores the loaded ``Holder`` tree of an imported
+    yaml file, keyed by the resolved import url and the digest of the
+    raw content that was fetched for it. Since the same url may serve
+    different content over time, an entry is only used if both the url
+    and the digest match.
+
+    Implementations must hand out holder trees that the caller is free to
+    mutate (imports merging modifies the imported holders in place).
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    @abc.abstractmethod
+    def get(self, import_url, digest, filename=None):
+        """Return a private copy of the cached holder tree or None."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def put(self, import_url, digest, parsed_holder, size):
+        """Store the holder tree loaded from ``size`` bytes of content."""
+        raise NotImplementedError
+
+
+class LRUImportCache(AbstractImportCache):
+    """
+    In memory, thread safe import cache bounded by the total size (in
+    bytes) of the raw imports it holds. The least recently used entries
+    are evicted once ``max_size_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_size_bytes=DEFAULT_MAX_SIZE_BYTES):
+        self.max_size_bytes = max_size_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, import_url, digest, filename=None):
+        key = (import_url, digest)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            # re-insert to mark as most recently used
+            self._entries[key] = entry
+            self.hits += 1
+        parsed_holder, _ = entry
+        return copy_holder(parsed_holder, filename=filename)
+
+    def put(self, import_url, digest, parsed_holder, size):
+        if size > self.max_size_bytes:
+            return
+        key = (import_url, digest)
+        entry = (copy_holder(parsed_holder), size)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= previous[1]
+            self._entries[key] = entry
+            self.size_bytes += size
+            while self.size_bytes > self.max_size_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self.size_bytes,
+                'max_size_bytes': self.max_size_bytes
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskImportCache(AbstractImportCache):
+    """
+    Import cache that persists loaded holder trees (including their line
+    and column marks) to a directory, so that a freshly started process
+    does not have to run the yaml loader on the same imports again.
+
+    Each import url is stored in its own file, in a compact marshal based
+    encoding. Stored entries whose content digest does not match the
+    digest of the fetched content are invalidated on lookup. Holder trees
+    containing values that cannot be encoded (e.g. yaml timestamps) are
+    simply not persisted.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    def get(self, import_url, digest, filename=None):
+        path = self._entry_path(import_url)
+        entry = self._read_entry(path)
+        if entry is None or entry[1] != import_url:
+            self._count('misses')
+            return None
+        _, _, stored_digest, stored_filename, encoded = entry
+        if stored_digest != digest:
+            self.invalidate(import_url)
+            self._count('misses')
+            return None
+        self._count('hits')
+        return _decode_holder(encoded, filename or stored_filename)
+
+    def put(self, import_url, digest, parsed_holder, size):
+        try:
+            data = marshal.dumps((DISK_FORMAT_VERSION,
+                                  import_url,
+                                  digest,
+                                  parsed_holder.filename,
+                                  _encode_holder(parsed_holder)))
+        except ValueError:
+            # unmarshallable value, keep loading this import from source
+            return
+        fd, temp_path = tempfile.mkstemp(dir=self.directory,
+                                         prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.rename(temp_path, self._entry_path(import_url))
+        except Exception:
+            _remove(temp_path)
+            raise
+
+    def invalidate(self, import_url):
+        if _remove(self._entry_path(import_url)):
+            self._count('invalidations')
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.bin'):
+                _remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations
+            }
+
+    def _entry_path(self, import_url):
+        if isinstance(import_url, unicode):
+            import_url = import_url.encode('utf-8')
+        return os.path.join(self.directory, '{0}.bin'.format(
+            hashlib.sha1(import_url).hexdigest()))
+
+    @staticmethod
+    def _read_entry(path):
+        try:
+            with open(path, 'rb') as f:
+                entry = marshal.loads(f.read())
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        except (EOFError, ValueError, TypeError):
+            # truncated or corrupted entry
+            _remove(path)
+            return None
+        if (not isinstance(entry, tuple) or len(entry) != 5 or
+                entry[0] != DISK_FORMAT_VERSION):
+            _remove(path)
+            return None
+        return entry
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+def warm_import_cache(import_cache, import_urls, resolver=None):
+    """Fetch and load the given import urls into ``import_cache``.
+
+    :param import_cache: The import cache to populate.
+    :param import_urls: Resolved import urls (http, https, ftp or file).
+    :param resolver: Import resolver used for fetching, defaults to
+                     ``DefaultImportResolver``.
+    :return: The urls that were loaded (i.e. were not already cached).
+    """
+    if resolver is None:
+        resolver = utils.create_import_resolver(None)
+    loaded = []
+    for import_url in import_urls:
+        raw_import = resolver.fetch_import(import_url)
+        digest = content_digest(raw_import)
+        if import_cache.get(import_url, digest) is not None:
+            continue
+        parsed_holder = utils.load_yaml(
+            raw_yaml=raw_import,
+            error_message="Failed to parse import '{0}'".format(import_url),
+            filename=import_url)
+        import_cache.put(import_url, digest, parsed_holder,
+                         size=len(raw_import))
+        loaded.append(import_url)
+    return loaded
+
+
+def content_digest(raw_content):
+    if isinstance(raw_content, unicode):
+        raw_content = raw_content.encode('utf-8')
+    return hashlib.sha1(raw_content).hexdigest()
+
+
+def copy_holder(parsed_holder, filename=None):
+    """Copy a holder tree, optionally replacing the filename of every node.
+
+    Only holders are copied, the raw scalar values they wrap are shared.
+    """
+    value = parsed_holder.value
+    if isinstance(value, dict):
+        value = dict((copy_holder(k, filename), copy_holder(v, filename))
+                     for k, v in value.iteritems())
+    elif isinstance(value, list):
+        value = [copy_holder(item, filename) for item in value]
+    elif isinstance(value, set):
+        value = set(copy_holder(item, filename) for item in value)
+    return holder.Holder(value=value,
+                         start_line=parsed_holder.start_line,
+                         start_column=parsed_holder.start_column,
+                         end_line=parsed_holder.end_line,
+                         end_column=parsed_holder.end_column,
+                         filename=filename or parsed_holder.filename)
+
+
+def _encode_holder(value_holder):
+    value = value_holder.value
+    if isinstance(value, dict):
+        kind = _DICT
+        value = [(_encode_holder(k), _encode_holder(v))
+                 for k, v in value.iteritems()]
+    elif isinstance(value, list):
+        kind = _LIST
+        value = [_encode_holder(item) for item in value]
+    elif isinstance(value, set):
+        kind = _SET
+        value = [_encode_holder(item) for item in value]
+    else:
+        kind = _SCALAR
+    return (kind,
+            value,
+            value_holder.start_line,
+            value_holder.start_column,
+            value_holder.end_line,
+            value_holder.end_column)
+
+
+def _decode_holder(encoded, filename):
+    kind, value, start_line, start_column, end_line, end_column = encoded
+    if kind == _DICT:
+        value = dict((_decode_holder(k, filename), _decode_holder(v, filename))
+                     for k, v in value)
+    elif kind == _LIST:
+        value = [_decode_holder(item, filename) for item in value]
+    elif kind == _SET:
+        value = set(_decode_holder(item, filename) for item in value)
+    return holder.Holder(value=value,
+                         start_line=start_line,
+                         start_column=start_column,
+                         end_line=end_line,
+                         end_column=end_column,
+                         filename=filename)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return False
+
+
+def _to_import_url(location):
+    if os.path.exists(location):
+        return 'file:{0}'.format(
+            urllib.pathname2url(os.path.abspath(location)))
+    return location
+
+
+def main(args=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Pre-warm an on disk import cache with the given '
+                    'import urls (or local paths).')
+    parser.add_argument('--cache-dir', required=True,
+                        help='Import cache directory')
+    parser.add_argument('urls', nargs='+', metavar='URL')
+    parsed_args = parser.parse_args(args)
+    import_cache = DiskImportCache(parsed_args.cache_dir)
+    loaded = warm_import_cache(
+        import_cache, [_to_import_url(url) for url in parsed_args.urls])
+    for import_url in loaded:
+        sys.stdout.write('{0}\n'.format(import_url))
+
+
+if __name__ == '__main__':
+    main()
@@ -15,9 +15,11 @@
 
 import abc
 import contextlib
+import threading
 import urllib2
 
 import requests
+from requests.adapters import HTTPAdapter
 from retrying import retry
 
 from dsl_parser import exceptions
@@ -25,6 +27,7 @@ from dsl_parser import exceptions
 DEFAULT_RETRY_DELAY = 1
 MAX_NUMBER_RETRIES = 5
 DEFAULT_REQUEST_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 10
 
 
 class AbstractImportResolver(object):
@@ -33,10 +36,20 @@ class AbstractImportResolver(object):
     implementations of import resolver.
     The only mandatory implementation is of resolve, which is expected
     to open the import url and return its data.
+
+    Resolvers whose ``fetch_import`` is thread safe may set
+    ``fetch_concurrency`` to a value greater than 1, in which case imports
+    of the same depth are fetched concurrently by up to that many threads.
+
+    Resolvers may also own an ``ImportSession`` (``session``), which is
+    then used for all http requests made on their behalf.
     """
 
     __metaclass__ = abc.ABCMeta
 
+    fetch_concurrency = 1
+    session = None
+
     @abc.abstractmethod
     def resolve(self, import_url):
         raise NotImplementedError
@@ -45,10 +58,84 @@ class AbstractImportResolver(object):
         url_parts = import_url.split(':')
         if url_parts[0] in ['http', 'https', 'ftp', 'file']:
             return self.resolve(import_url)
-        return read_import(import_url)
+        return read_import(import_url, session=self.session)
+
+
+class ImportSession(object):
+    """
+    A keep-alive http session with a connection pool per host, used for
+    reading imports (and checking resources exist) without paying a new
+    connection for every request.
+
+    The session remembers the ``ETag`` and ``Last-Modified`` validators of
+    the imports it read and revalidates them with conditional requests, so
+    unchanged imports are answered with a body-less 304 response.
+    """
+
+    def __init__(self,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_REQUEST_TIMEOUT,
+                 max_retries=MAX_NUMBER_RETRIES,
+                 retry_delay=DEFAULT_RETRY_DELAY):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._validated = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self._lock:
+            validated = self._validated.get(url)
+        headers = {}
+        if validated:
+            etag, last_modified, _ = validated
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        response = self._session.get(url,
+                                     timeout=timeout or self.timeout,
+                                     headers=headers)
+        if response.status_code == 304 and validated:
+            return _NotModifiedResponse(validated[2])
+        if 200 <= response.status_code < 300:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                with self._lock:
+                    self._validated[url] = (etag,
+                                            last_modified,
+                                            response.text)
+        return response
+
+    def exists(self, url, timeout=None):
+        try:
+            response = self._session.get(url,
+                                         timeout=timeout or self.timeout,
+                                         stream=True)
+        except requests.RequestException:
+            return False
+        response.close()
+        return response.status_code < 400
+
+    def close(self):
+        self._session.close()
+
+
+class _NotModifiedResponse(object):
+
+    status_code = 200
+
+    def __init__(self, text):
+        self.text = text
 
 
-def read_import(import_url):
+def read_import(import_url, session=None):
     error_str = 'Import failed: Unable to open import url'
     if import_url.startswith('file:'):
         try:
@@ -59,7 +146,16 @@ def read_import(import_url):
                 13, '{0} {1}; {2}'.format(error_str, import_url, ex))
             raise ex
     else:
-        number_of_attempts = MAX_NUMBER_RETRIES + 1
+        if session is None:
+            http_get = requests.get
+            timeout = DEFAULT_REQUEST_TIMEOUT
+            number_of_attempts = MAX_NUMBER_RETRIES + 1
+            retry_delay = DEFAULT_RETRY_DELAY
+        else:
+            http_get = session.get
+            timeout = session.timeout
+            number_of_attempts = session.max_retries + 1
+            retry_delay = session.retry_delay
 
         # Defines on which errors we should retry the import.
         def _is_recoverable_error(e):
@@ -70,12 +166,11 @@ def read_import(import_url):
             return hasattr(result, 'status_code') and result.status_code >= 500
 
         @retry(stop_max_attempt_number=number_of_attempts,
-               wait_fixed=DEFAULT_RETRY_DELAY,
+               wait_fixed=retry_delay,
                retry_on_exception=_is_recoverable_error,
                retry_on_result=_is_internal_error)
         def get_import():
-            response = requests.get(import_url,
-                                    timeout=DEFAULT_REQUEST_TIMEOUT)
+            response = http_get(import_url, timeout=timeout)
             # The response is a valid one, and the content should be returned
             if 200 <= response.status_code < 300:
                 return response.text
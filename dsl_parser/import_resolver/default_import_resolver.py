@@ -14,11 +14,19 @@
 #  * limitations under the License.
 from dsl_parser.exceptions import DSLParsingLogicException
 
-from dsl_parser.import_resolver.abstract_import_resolver \
-    import AbstractImportResolver, read_import
+from dsl_parser.import_resolver.abstract_import_resolver import (
+    AbstractImportResolver,
+    ImportSession,
+    read_import,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_RETRY_DELAY,
+    MAX_NUMBER_RETRIES)
 
 DEFAULT_RULES = []
 DEFAULT_RESLOVER_RULES_KEY = 'rules'
+DEFAULT_FETCH_CONCURRENCY = 1
+FETCH_CONCURRENCY_KEY = 'fetch_concurrency'
 
 
 class DefaultResolverValidationException(Exception):
@@ -70,14 +78,33 @@ class DefaultImportResolver(AbstractImportResolver):
 
         In case that all the resolve attempts will fail,
         a DSLParsingLogicException will be raise.
+
+    The optional ``fetch_concurrency`` parameter sets the maximal number
+    of imports fetched concurrently (default: 1, i.e. one at a time).
+
+    Http imports are read through a pooled keep-alive ``ImportSession``,
+    configured by the optional ``pool_size`` (connections kept per host),
+    ``request_timeout`` (seconds), ``max_retries`` and ``retry_delay``
+    (milliseconds) parameters.
     """
 
-    def __init__(self, rules=None):
+    def __init__(self, rules=None,
+                 fetch_concurrency=DEFAULT_FETCH_CONCURRENCY,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 request_timeout=DEFAULT_REQUEST_TIMEOUT,
+                 max_retries=MAX_NUMBER_RETRIES,
+                 retry_delay=DEFAULT_RETRY_DELAY):
         # set the rules
         self.rules = rules
         if self.rules is None:
             self.rules = DEFAULT_RULES
         self._validate_rules()
+        self.fetch_concurrency = fetch_concurrency
+        self._validate_fetch_concurrency()
+        self.session = ImportSession(pool_size=pool_size,
+                                     timeout=request_timeout,
+                                     max_retries=max_retries,
+                                     retry_delay=retry_delay)
 
     def resolve(self, import_url):
         failed_urls = {}
@@ -94,7 +121,8 @@ class DefaultImportResolver(AbstractImportResolver):
                 if url_to_resolve not in failed_urls.keys():
                     # there is no point to try to resolve the same url twice
                     try:
-                        return read_import(url_to_resolve)
+                        return read_import(url_to_resolve,
+                                           session=self.session)
                     except DSLParsingLogicException, ex:
                         # failed to resolve current rule,
                         # continue to the next one
@@ -103,7 +131,7 @@ class DefaultImportResolver(AbstractImportResolver):
         # failed to resolve the url using the rules
         # trying to open the original url
         try:
-            return read_import(import_url)
+            return read_import(import_url, session=self.session)
         except DSLParsingLogicException, ex:
             if not self.rules:
                 raise
@@ -143,3 +171,12 @@ class DefaultImportResolver(AbstractImportResolver):
                     'Each rule must be a dictionary with one (key,value) pair '
                     'but the rule [{0}] has {1} keys.'
                     .format(rule, len(keys)))
+
+    def _validate_fetch_concurrency(self):
+        if (not isinstance(self.fetch_concurrency, int) or
+                isinstance(self.fetch_concurrency, bool) or
+                self.fetch_concurrency < 1):
+            raise DefaultResolverValidationException(
+                'Invalid parameters supplied for the default resolver: '
+                'The `{0}` parameter must be a positive integer but it is '
+                '{1}.'.format(FETCH_CONCURRENCY_KEY, self.fetch_concurrency))
@@ -36,6 +36,7 @@ class Plan(dict):
 
     def __init__(self, plan):
         self.update(plan)
+        self._node_template_indexes = {}
 
     @property
     def version(self):
@@ -52,3 +53,26 @@ class Plan(dict):
     @property
     def node_templates(self):
         return self['nodes']
+
+    @property
+    def node_templates_by_id(self):
+        """Node templates keyed by id, rebuilt when ``nodes`` changes."""
+        return self._node_template_index('id')
+
+    @property
+    def node_templates_by_name(self):
+        """Node templates keyed by name, rebuilt when ``nodes`` changes."""
+        return self._node_template_index('name')
+
+    def _node_template_index(self, key):
+        nodes = self['nodes']
+        index = self._node_template_indexes.get(key)
+        if (index is None or index[0] is not nodes or
+                index[1] != len(nodes)):
+            node_templates = {}
+            for node in nodes:
+                # same as a linear scan, the first match wins
+                node_templates.setdefault(node[key], node)
+            index = (nodes, len(nodes), node_templates)
+            self._node_template_indexes[key] = index
+        return index[2]
@@ -16,7 +16,10 @@
 import contextlib
 import urllib2
 
+import requests
+
 from dsl_parser import (functions,
+                        holder,
                         utils)
 from dsl_parser.framework import parser
 from dsl_parser.elements import blueprint
@@ -28,7 +31,8 @@ def parse_from_path(dsl_file_path,
                     resources_base_url=None,
                     resolver=None,
                     validate_version=True,
-                    additional_resource_sources=()):
+                    additional_resource_sources=(),
+                    import_cache=None):
     with open(dsl_file_path, 'r') as f:
         dsl_string = f.read()
     return _parse(dsl_string,
@@ -36,41 +40,69 @@ def parse_from_path(dsl_file_path,
                   dsl_location=dsl_file_path,
                   resolver=resolver,
                   validate_version=validate_version,
-                  additional_resource_sources=additional_resource_sources)
+                  additional_resource_sources=additional_resource_sources,
+                  import_cache=import_cache)
 
 
 def parse_from_url(dsl_url,
                    resources_base_url=None,
                    resolver=None,
                    validate_version=True,
-                   additional_resource_sources=()):
-    try:
-        with contextlib.closing(urllib2.urlopen(dsl_url)) as f:
-            dsl_string = f.read()
-    except urllib2.HTTPError as e:
-        if e.code == 404:
-            # HTTPError.__str__ uses the 'msg'.
-            # by default it is set to 'Not Found' for 404 errors, which is not
-            # very helpful, so we override it with a more meaningful message
-            # that specifies the missing url.
-            e.msg = '{0} not found'.format(e.filename)
-        raise
+                   additional_resource_sources=(),
+                   import_cache=None):
+    if not resolver:
+        resolver = DefaultImportResolver()
+    session = getattr(resolver, 'session', None)
+    if session is not None and dsl_url.split(':')[0] in ['http', 'https']:
+        dsl_string = _read_http_url(dsl_url, session)
+    else:
+        try:
+            with contextlib.closing(urllib2.urlopen(dsl_url)) as f:
+                dsl_string = f.read()
+        except urllib2.HTTPError as e:
+            if e.code == 404:
+                # HTTPError.__str__ uses the 'msg'.
+                # by default it is set to 'Not Found' for 404 errors, which
+                # is not very helpful, so we override it with a more
+                # meaningful message that specifies the missing url.
+                e.msg = '{0} not found'.format(e.filename)
+            raise
     return _parse(dsl_string,
                   resources_base_url=resources_base_url,
                   dsl_location=dsl_url,
                   resolver=resolver,
                   validate_version=validate_version,
-                  additional_resource_sources=additional_resource_sources)
+                  additional_resource_sources=additional_resource_sources,
+                  import_cache=import_cache)
+
+
+def _read_http_url(dsl_url, session):
+    # errors are raised as their urllib2 counterparts, as they would be
+    # when reading the url without a session
+    try:
+        response = session.get(dsl_url)
+    except requests.RequestException as e:
+        raise urllib2.URLError(e)
+    if not 200 <= response.status_code < 300:
+        if response.status_code == 404:
+            msg = '{0} not found'.format(dsl_url)
+        else:
+            msg = response.reason
+        raise urllib2.HTTPError(dsl_url, response.status_code, msg,
+                                response.headers, None)
+    return response.text
 
 
 def parse(dsl_string,
           resources_base_url=None,
           resolver=None,
-          validate_version=True):
+          validate_version=True,
+          import_cache=None):
     return _parse(dsl_string,
                   resources_base_url=resources_base_url,
                   resolver=resolver,
-                  validate_version=validate_version)
+                  validate_version=validate_version,
+                  import_cache=import_cache)
 
 
 def _parse(dsl_string,
@@ -78,7 +110,8 @@ def _parse(dsl_string,
            dsl_location=None,
            resolver=None,
            validate_version=True,
-           additional_resource_sources=()):
+           additional_resource_sources=(),
+           import_cache=None):
     parsed_dsl_holder = utils.load_yaml(raw_yaml=dsl_string,
                                         error_message='Failed to parse DSL',
                                         filename=dsl_location)
@@ -88,7 +121,8 @@ def _parse(dsl_string,
 
     # validate version schema and extract actual version used
     result = parser.parse(
-        parsed_dsl_holder,
+        _schema_keys_holder(parsed_dsl_holder,
+                            blueprint.BlueprintVersionExtractor),
         element_cls=blueprint.BlueprintVersionExtractor,
         inputs={
             'validate_version': validate_version
@@ -98,20 +132,26 @@ def _parse(dsl_string,
 
     # handle imports
     result = parser.parse(
-        value=parsed_dsl_holder,
+        value=_schema_keys_holder(parsed_dsl_holder,
+                                  blueprint.BlueprintImporter),
         inputs={
             'main_blueprint_holder': parsed_dsl_holder,
             'resources_base_url': resources_base_url,
             'blueprint_location': dsl_location,
             'version': version,
             'resolver': resolver,
-            'validate_version': validate_version
+            'validate_version': validate_version,
+            'import_cache': import_cache
         },
         element_cls=blueprint.BlueprintImporter,
         strict=False)
     resource_base = [result['resource_base']]
     if additional_resource_sources:
         resource_base.extend(additional_resource_sources)
+    # existence of operation and workflow scripts is checked against the
+    # resource bases many times, so the results are indexed per parse
+    resource_index = utils.ResourceIndex(
+        resource_base, session=getattr(resolver, 'session', None))
 
     merged_blueprint_holder = result['merged_blueprint']
 
@@ -119,10 +159,32 @@ def _parse(dsl_string,
     plan = parser.parse(
         value=merged_blueprint_holder,
         inputs={
-            'resource_base': resource_base,
+            'resource_base': resource_index,
             'validate_version': validate_version
         },
         element_cls=blueprint.Blueprint)
 
     functions.validate_functions(plan)
     return plan
+
+
+def _schema_keys_holder(dsl_holder, element_cls):
+    """Return a shallow copy of the blueprint holder that only contains the
+    top level keys in the schema of ``element_cls``.
+
+    The version extraction and imports resolution passes only look at a few
+    top level keys, parsing them over the full blueprint would build (and
+    restore the values of) elements for every other section as well.
+    Non string keys are kept, so they are still reported by the first pass.
+    """
+    if not isinstance(dsl_holder.value, dict):
+        return dsl_holder
+    schema = element_cls.schema
+    value = dict((k, v) for k, v in dsl_holder.value.iteritems()
+                 if not isinstance(k.value, basestring) or k.value in schema)
+    return holder.Holder(value=value,
+                         start_line=dsl_holder.start_line,
+                         start_column=dsl_holder.start_column,
+                         end_line=dsl_holder.end_line,
+                         end_column=dsl_holder.end_column,
+                         filename=dsl_holder.filename)
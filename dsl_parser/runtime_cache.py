@@ -0,0 +1,149 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import copy
+import threading
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 10000
+
+_NODE = 'node'
+_NODE_INSTANCE = 'node_instance'
+
+
+class RuntimeEvaluationCache(object):
+    """
+    In memory, thread safe cache of the nodes and node instances fetched
+    for runtime function evaluation, meant to be shared across evaluations
+    (e.g. by all the operations executed during a workflow). Holds at most
+    ``max_entries`` entries, the least recently used entries are evicted
+    first.
+
+    Node instances are keyed by deployment id and node instance id and are
+    only served as long as the version supplied by the caller matches the
+    version they were cached with. Nodes are keyed by deployment id and
+    node id, ``invalidate`` should be called when the nodes of a
+    deployment change (e.g. on deployment update).
+
+    The cache stores and hands out private copies, so callers are free to
+    mutate what they get.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def deployment(self, deployment_id, get_node_instance_version_method=None):
+        """Returns a view of the cache for a single deployment, as expected
+        by ``functions.evaluate_functions``.
+
+        :param deployment_id: The deployment id.
+        :param get_node_instance_version_method: A method returning the
+                                                 current version of a node
+                                                 instance. Node instances
+                                                 are not cached without it.
+        """
+        return DeploymentRuntimeCache(self,
+                                      deployment_id,
+                                      get_node_instance_version_method)
+
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            cached_version, value = entry
+            if cached_version != version:
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            # re-insert to mark as most recently used
+            self._entries[key] = entry
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key, value, version=None):
+        entry = (version, copy.deepcopy(value))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, deployment_id):
+        with self._lock:
+            keys = [key for key in self._entries
+                    if key[1] == deployment_id]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DeploymentRuntimeCache(object):
+
+    def __init__(self, cache, deployment_id,
+                 get_node_instance_version_method=None):
+        self.cache = cache
+        self.deployment_id = deployment_id
+        self._get_node_instance_version_method = \
+            get_node_instance_version_method
+
+    def get_node_instance(self, node_instance_id, get_node_instance_method):
+        if self._get_node_instance_version_method is None:
+            return get_node_instance_method(node_instance_id)
+        key = (_NODE_INSTANCE, self.deployment_id, node_instance_id)
+        version = self._get_node_instance_version_method(node_instance_id)
+        node_instance = self.cache.get(key, version)
+        if node_instance is None:
+            node_instance = get_node_instance_method(node_instance_id)
+            self.cache.put(key, node_instance, version)
+        return node_instance
+
+    def get_node(self, node_id, get_node_method):
+        key = (_NODE, self.deployment_id, node_id)
+        node = self.cache.get(key)
+        if node is None:
+            node = get_node_method(node_id)
+            self.cache.put(key, node)
+        return node
@@ -13,6 +13,10 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import hashlib
+import json
+
+from dsl_parser import constants
 
 NODE_TEMPLATE_SCOPE = 'node_template'
 NODE_TEMPLATE_RELATIONSHIP_SCOPE = 'node_template_relationship'
@@ -21,13 +25,113 @@ POLICIES_SCOPE = 'policies'
 SCALING_GROUPS_SCOPE = 'scaling_groups'
 
 
+class LazyPath(tuple):
+    """
+    A (parent path, key, is list index) property path, which is only
+    formatted when converted to a string.
+
+    Compares equal to, hashes like and can be concatenated with its
+    formatted string, and string methods are delegated to it. It is not a
+    string though (e.g. for ``%`` formatting, ``json.dumps`` or
+    ``isinstance`` checks), so handlers passing paths on should convert
+    them with ``str`` first, as ``functions.parse`` does.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        lazy_paths = []
+        path = self
+        while isinstance(path, LazyPath):
+            lazy_paths.append(path)
+            path = path[0]
+        for _, key, is_index in reversed(lazy_paths):
+            template = '{0}[{1}]' if is_index else '{0}.{1}'
+            path = template.format(path, key)
+        return path
+
+    def __unicode__(self):
+        return unicode(str(self))
+
+    def __repr__(self):
+        return 'LazyPath({0!r})'.format(str(self))
+
+    def __eq__(self, other):
+        return str(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __add__(self, other):
+        return str(self) + other
+
+    def __radd__(self, other):
+        return other + str(self)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(str(self), name)
+
+
+_new_lazy_path = tuple.__new__
+
+
+class FunctionMarkers(object):
+    """
+    Out of band markers of the containers (dicts and lists) which contain
+    an intrinsic function call at any depth, including the function call
+    dicts themselves. Scans given the markers skip unmarked (function
+    free) containers entirely.
+
+    Containers are marked by identity (and kept referenced), so markers
+    only apply to the very objects they were created for, and only as long
+    as these are not changed to hold new function calls. They are meant to
+    be created and used within a single operation (e.g. validating the
+    functions of a newly parsed plan), not kept along with the values.
+    """
+
+    def __init__(self):
+        self._containers = {}
+
+    def mark(self, value, is_function):
+        """Marks ``value`` and the containers nested in it.
+
+        :return: Whether ``value`` contains a function call.
+        """
+        if isinstance(value, dict):
+            items = value.itervalues()
+        elif isinstance(value, list):
+            items = value
+        else:
+            return False
+        contains_function = is_function(value)
+        for item in items:
+            if self.mark(item, is_function):
+                contains_function = True
+        if contains_function:
+            self._containers[id(value)] = value
+        return contains_function
+
+    def __contains__(self, value):
+        return id(value) in self._containers
+
+    def __len__(self):
+        return len(self._containers)
+
+
 def scan_properties(value,
                     handler,
                     scope=None,
                     context=None,
                     path='',
                     replace=False,
-                    recursive=True):
+                    recursive=True,
+                    lazy_path=False,
+                    markers=None):
     """
     Scans properties dict recursively and applies the provided handler
     method for each property.
@@ -44,8 +148,22 @@ def scan_properties(value,
     :param value: The properties container (dict/list).
     :param handler: A method for applying for to each property.
     :param path: The properties base path (for debugging purposes).
+    :param lazy_path: Scan iteratively and pass the handler ``LazyPath``
+                      paths, which are only formatted if used.
+    :param markers: ``FunctionMarkers`` of the scanned value. If provided,
+                    containers without function calls are not scanned.
     """
-    if isinstance(value, dict):
+    if markers is not None and value not in markers:
+        return
+    if lazy_path:
+        _scan_properties_iteratively(value, handler,
+                                     scope=scope,
+                                     context=context,
+                                     path=path,
+                                     replace=replace,
+                                     recursive=recursive,
+                                     markers=markers)
+    elif isinstance(value, dict):
         for k, v in value.iteritems():
             current_path = '{0}.{1}'.format(path, k)
             result = handler(v, scope, context, current_path)
@@ -56,7 +174,8 @@ def scan_properties(value,
                                 scope=scope,
                                 context=context,
                                 path=current_path,
-                                replace=replace)
+                                replace=replace,
+                                markers=markers)
     elif isinstance(value, list):
         for index, item in enumerate(value):
             current_path = '{0}[{1}]'.format(path, index)
@@ -69,90 +188,312 @@ def scan_properties(value,
                                 scope=scope,
                                 context=context,
                                 path=path,
-                                replace=replace)
+                                replace=replace,
+                                markers=markers)
+
+
+def _scan_properties_iteratively(value, handler, scope, context, path,
+                                 replace, recursive, markers):
+    # a stack of the containers being scanned along with iterators over
+    # their items, visiting the values in the same order as the recursive
+    # scan does
+    stack = []
+    _push_container(stack, value, path, markers)
+    while stack:
+        container, items, base_path, is_list = stack[-1]
+        for key, item in items:
+            item_path = _new_lazy_path(LazyPath, (base_path, key, is_list))
+            result = handler(item, scope, context, item_path)
+            if replace and result != item:
+                container[key] = result
+            if recursive and _push_container(
+                    stack, item, base_path if is_list else item_path,
+                    markers):
+                break
+        else:
+            stack.pop()
+
+
+def _push_container(stack, value, path, markers=None):
+    if markers is not None and value not in markers:
+        return False
+    if isinstance(value, dict):
+        stack.append((value, value.iteritems(), path, False))
+    elif isinstance(value, list):
+        stack.append((value, enumerate(value), path, True))
+    else:
+        return False
+    return True
 
 
-def _scan_operations(operations,
-                     handler,
-                     scope=None,
-                     context=None,
-                     path='',
-                     replace=False):
+def _operations_inputs(operations, scope=None, context=None, path=''):
     for name, definition in operations.iteritems():
         if isinstance(definition, dict) and 'inputs' in definition:
             context = context.copy() if context else {}
             context['operation'] = definition
-            scan_properties(definition['inputs'],
-                            handler,
-                            scope=scope,
-                            context=context,
-                            path='{0}.{1}.inputs'.format(path, name),
-                            replace=replace)
+            yield (name,
+                   definition['inputs'],
+                   context,
+                   '{0}.{1}.inputs'.format(path, name))
 
 
 def scan_node_operation_properties(node_template, handler, replace=False):
-    _scan_operations(node_template['operations'],
-                     handler,
-                     scope=NODE_TEMPLATE_SCOPE,
-                     context=node_template,
-                     path='{0}.operations'.format(node_template['name']),
-                     replace=replace)
-    for r in node_template.get('relationships', []):
-        context = {'node_template': node_template, 'relationship': r}
-        _scan_operations(r.get('source_operations', {}),
-                         handler,
-                         scope=NODE_TEMPLATE_RELATIONSHIP_SCOPE,
-                         context=context,
-                         path='{0}.{1}'.format(node_template['name'],
-                                               r['type']),
-                         replace=replace)
-        _scan_operations(r.get('target_operations', {}),
-                         handler,
-                         scope=NODE_TEMPLATE_RELATIONSHIP_SCOPE,
-                         context=context,
-                         path='{0}.{1}'.format(node_template['name'],
-                                               r['type']),
-                         replace=replace)
-
-
-def scan_service_template(plan, handler, replace=False):
-    for node_template in plan.node_templates:
-        scan_properties(node_template['properties'],
+    for _, inputs, scope, context, path in _node_operation_roots(
+            node_template):
+        scan_properties(inputs,
                         handler,
-                        scope=NODE_TEMPLATE_SCOPE,
-                        context=node_template,
-                        path='{0}.properties'.format(
-                            node_template['name']),
+                        scope=scope,
+                        context=context,
+                        path=path,
                         replace=replace)
+
+
+def _node_operation_roots(node_template, key_path=()):
+    for name, inputs, context, path in _operations_inputs(
+            node_template['operations'],
+            scope=NODE_TEMPLATE_SCOPE,
+            context=node_template,
+            path='{0}.operations'.format(node_template['name'])):
+        yield (key_path + ('operations', name, 'inputs'),
+               inputs, NODE_TEMPLATE_SCOPE, context, path)
+    for index, r in enumerate(node_template.get('relationships', [])):
+        context = {'node_template': node_template, 'relationship': r}
+        for operations_key in ['source_operations', 'target_operations']:
+            for name, inputs, operation_context, path in _operations_inputs(
+                    r.get(operations_key, {}),
+                    scope=NODE_TEMPLATE_RELATIONSHIP_SCOPE,
+                    context=context,
+                    path='{0}.{1}'.format(node_template['name'],
+                                          r['type'])):
+                yield (key_path + ('relationships', index,
+                                   operations_key, name, 'inputs'),
+                       inputs,
+                       NODE_TEMPLATE_RELATIONSHIP_SCOPE,
+                       operation_context,
+                       path)
+
+
+def _service_template_roots(plan):
+    """
+    Yields every value scanned by ``scan_service_template``, in scan order,
+    as a (key path, value, scope, context, path) tuple. The key path
+    locates the value in the plan and is used to key the function sites
+    index.
+    """
+    for index, node_template in enumerate(plan.node_templates):
+        key_path = (constants.NODES, index)
+        yield (key_path + ('properties',),
+               node_template['properties'],
+               NODE_TEMPLATE_SCOPE,
+               node_template,
+               '{0}.properties'.format(node_template['name']))
         for name, capability in node_template.get('capabilities', {}).items():
-            scan_properties(capability.get('properties', {}),
-                            handler,
-                            scope=NODE_TEMPLATE_SCOPE,
-                            context=node_template,
-                            path='{0}.capabilities.{1}'.format(
-                                node_template['name'],
-                                name),
-                            replace=replace)
-        scan_node_operation_properties(node_template, handler, replace=replace)
+            yield (key_path + ('capabilities', name, 'properties'),
+                   capability.get('properties', {}),
+                   NODE_TEMPLATE_SCOPE,
+                   node_template,
+                   '{0}.capabilities.{1}'.format(node_template['name'],
+                                                 name))
+        for root in _node_operation_roots(node_template, key_path):
+            yield root
     for output_name, output in plan.outputs.iteritems():
-        scan_properties(output,
-                        handler,
-                        scope=OUTPUTS_SCOPE,
-                        context=plan.outputs,
-                        path='outputs.{0}'.format(output_name),
-                        replace=replace)
-    for policy_name, policy in plan.get('policies', {}).items():
-        scan_properties(policy.get('properties', {}),
-                        handler,
-                        scope=POLICIES_SCOPE,
-                        context=policy,
-                        path='policies.{0}.properties'.format(policy_name),
-                        replace=replace)
-    for group_name, scaling_group in plan.get('scaling_groups', {}).items():
-        scan_properties(scaling_group.get('properties', {}),
-                        handler,
-                        scope=SCALING_GROUPS_SCOPE,
-                        context=scaling_group,
-                        path='scaling_groups.{0}.properties'.format(
-                            group_name),
-                        replace=replace)
+        yield ((constants.OUTPUTS, output_name),
+               output,
+               OUTPUTS_SCOPE,
+               plan.outputs,
+               'outputs.{0}'.format(output_name))
+    for policy_name, policy in plan.get(constants.POLICIES, {}).items():
+        yield ((constants.POLICIES, policy_name, 'properties'),
+               policy.get('properties', {}),
+               POLICIES_SCOPE,
+               policy,
+               'policies.{0}.properties'.format(policy_name))
+    for group_name, scaling_group in plan.get(constants.SCALING_GROUPS,
+                                              {}).items():
+        yield ((constants.SCALING_GROUPS, group_name, 'properties'),
+               scaling_group.get('properties', {}),
+               SCALING_GROUPS_SCOPE,
+               scaling_group,
+               'scaling_groups.{0}.properties'.format(group_name))
+
+
+def scan_service_template(plan,
+                          handler,
+                          replace=False,
+                          function_sites=None,
+                          lazy_path=False,
+                          markers=None,
+                          is_function=None):
+    """
+    Scans all the properties, operation inputs, outputs, policies and
+    scaling groups properties of a plan with ``scan_properties``.
+
+    :param function_sites: A function sites index, as created by
+                           ``find_function_sites``. If provided, the values
+                           which are unchanged since the index was created
+                           are only scanned at their indexed sites (and the
+                           values nested in them), function free values are
+                           skipped. Values which changed or which the index
+                           has no entry for are scanned entirely.
+    :param lazy_path: Passed on to ``scan_properties``.
+    :param markers: Passed on to ``scan_properties``.
+    :param is_function: Checks whether a value is a function call, it is
+                        required along with ``function_sites``.
+    """
+    roots = list(_service_template_roots(plan))
+    if function_sites is not None:
+        function_sites = _resolve_function_sites(roots, function_sites,
+                                                 is_function)
+    for key_path, value, scope, context, path in roots:
+        sites = None
+        if function_sites is not None:
+            sites = function_sites.get(key_path)
+        if sites is None:
+            scan_properties(value, handler,
+                            scope=scope,
+                            context=context,
+                            path=path,
+                            replace=replace,
+                            lazy_path=lazy_path,
+                            markers=markers)
+        else:
+            _scan_sites(sites, handler,
+                        scope=scope,
+                        context=context,
+                        replace=replace,
+                        lazy_path=lazy_path,
+                        markers=markers)
+
+
+def mark_service_template(plan, is_function):
+    """
+    Creates the ``FunctionMarkers`` of all the values scanned by
+    ``scan_service_template``.
+    """
+    markers = FunctionMarkers()
+    for _, value, _, _, _ in _service_template_roots(plan):
+        markers.mark(value, is_function)
+    return markers
+
+
+def find_function_sites(plan, is_function, markers=None):
+    """
+    Creates an index of the values scanned by ``scan_service_template``
+    which ``is_function``.
+
+    The index is a JSON serializable list of [key path, digest, sites]
+    entries, one for every scanned value, in scan order. The key path
+    locates the scanned value in the plan, the digest identifies its
+    content (see ``value_digest``) and each site is the key path of a
+    function call, relative to that value. Function calls nested inside
+    other function calls are not indexed as they are reached by scanning
+    the outer call.
+
+    :param markers: ``FunctionMarkers`` of the plan, used for skipping
+                    function free containers.
+    """
+    function_sites = []
+    for key_path, value, _, _, _ in _service_template_roots(plan):
+        sites = []
+        _find_sites(value, is_function, [], sites, markers)
+        function_sites.append([list(key_path), value_digest(value), sites])
+    return function_sites
+
+
+def value_digest(value):
+    """
+    Returns a digest of a JSON serializable value, or None if it cannot be
+    serialized. Equal values serialized the same (i.e. having the same
+    dict items order) have the same digest.
+    """
+    try:
+        serialized = json.dumps(value, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(serialized).hexdigest()
+
+
+def _find_sites(value, is_function, key_path, sites, markers=None):
+    if markers is not None and value not in markers:
+        return
+    if isinstance(value, dict):
+        items = value.iteritems()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return
+    for k, v in items:
+        if is_function(v):
+            sites.append(key_path + [k])
+        else:
+            _find_sites(v, is_function, key_path + [k], sites, markers)
+
+
+def _resolve_function_sites(roots, function_sites, is_function):
+    """
+    Resolves the sites of a function sites index against the values
+    scanned by ``scan_service_template``.
+
+    Returns a dict of the resolved sites by key path, of the values whose
+    digest is the one recorded in the index and whose sites all hold a
+    function call.
+    """
+    function_sites = dict((tuple(key_path), (digest, sites))
+                          for key_path, digest, sites in function_sites)
+    resolved = {}
+    for key_path, value, _, _, path in roots:
+        digest, sites = function_sites.get(key_path, (None, None))
+        if digest is None or digest != value_digest(value):
+            continue
+        resolved_sites = []
+        for site in sites:
+            site = _resolve_site(value, site, path)
+            if site is None or not is_function(site[0][site[1]]):
+                break
+            resolved_sites.append(site)
+        else:
+            resolved[key_path] = resolved_sites
+    return resolved
+
+
+def _scan_sites(sites, handler, scope, context, replace, lazy_path,
+                markers):
+    for container, key, current_path, base_path in sites:
+        v = container[key]
+        result = handler(v, scope, context, current_path)
+        if replace and result != v:
+            container[key] = result
+        scan_properties(v, handler,
+                        scope=scope,
+                        context=context,
+                        path=base_path,
+                        replace=replace,
+                        lazy_path=lazy_path,
+                        markers=markers)
+
+
+def _resolve_site(value, site, path):
+    """
+    Returns the container of a site along with its key and the paths
+    ``scan_properties`` would have passed the handler for it and for the
+    values nested in it, or None if the site cannot be found in ``value``.
+    """
+    if not site:
+        return None
+    container = None
+    key = None
+    current_path = base_path = path
+    for key in site:
+        container = value
+        if isinstance(container, dict):
+            if key not in container:
+                return None
+            current_path = base_path = '{0}.{1}'.format(base_path, key)
+        elif isinstance(container, list):
+            if not isinstance(key, int) or not 0 <= key < len(container):
+                return None
+            current_path = '{0}[{1}]'.format(base_path, key)
+        else:
+            return None
+        value = container[key]
+    return container, key, current_path, base_path
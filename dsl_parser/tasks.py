@@ -16,7 +16,8 @@
 import copy
 import json
 
-from dsl_parser import (functions,
+from dsl_parser import (constants,
+                        functions,
                         exceptions,
                         scan,
                         models,
@@ -34,13 +35,15 @@ def parse_dsl(dsl_location,
               resources_base_url,
               resolver=None,
               validate_version=True,
-              additional_resources=()):
+              additional_resources=(),
+              import_cache=None):
     return parser.parse_from_url(
             dsl_url=dsl_location,
             resources_base_url=resources_base_url,
             resolver=resolver,
             validate_version=validate_version,
-            additional_resource_sources=additional_resources)
+            additional_resource_sources=additional_resources,
+            import_cache=import_cache)
 
 
 def _set_plan_inputs(plan, inputs=None):
@@ -81,7 +84,11 @@ def _set_plan_inputs(plan, inputs=None):
 
 def _process_functions(plan):
     handler = functions.plan_evaluation_handler(plan)
-    scan.scan_service_template(plan, handler, replace=True)
+    scan.scan_service_template(
+        plan, handler, replace=True,
+        function_sites=plan.get(constants.FUNCTION_SITES),
+        lazy_path=True,
+        is_function=functions.is_function)
 
 
 def prepare_deployment_plan(plan, inputs=None, **kwargs):
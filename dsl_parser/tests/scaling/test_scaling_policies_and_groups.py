@@ -353,6 +353,10 @@ class TestRemovedContainedInMember(AbstractTestParser):
         for group, expected_members in expected.items():
             self.assertEqual(set(expected_members),
                              set(plan['scaling_groups'][group]['members']))
+        # members are only removed from the scaling groups
+        for group, members in groups.items():
+            self.assertEqual(set(members),
+                             set(plan['groups'][group]['members']))
 
 
 class TestScalingPoliciesAndGroupsValidation(AbstractTestParser):
@@ -586,6 +590,17 @@ class TestScalingPoliciesAndGroupsValidation(AbstractTestParser):
             expected_error_code=exceptions.ERROR_GROUP_CYCLE,
             groups=groups)
 
+    def test_validate_no_group_cycles_many_cycles(self):
+        # every group is a member of every other group, a single cycle is
+        # reported without enumerating all of them
+        group_names = ['group{0}'.format(i) for i in range(12)]
+        groups = dict((name, [member for member in group_names
+                              if member != name])
+                      for name in group_names)
+        self.assert_validation(
+            expected_error_code=exceptions.ERROR_GROUP_CYCLE,
+            groups=groups)
+
     def test_validate_node_type_group_members_in_one_group_only(self):
         groups = {
             'group1': ['node'],
@@ -13,8 +13,12 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import copy
+
 from dsl_parser.tests.abstract_test_parser import AbstractTestParser
-from dsl_parser import exceptions
+from dsl_parser import (exceptions,
+                        utils)
+from dsl_parser.elements import types
 from dsl_parser.exceptions import DSLParsingLogicException
 
 
@@ -705,3 +709,50 @@ node_templates:
         properties = self.parse_1_2(yaml)['nodes'][0]['properties']
         self.assertEqual(properties['prop1']['prop1'], 'value1')
         self.assertEqual(properties['prop2']['prop2'], 'value2')
+
+    def test_merge_schemas_keeps_schemas(self):
+        overridden = {'pair': {'type': 'pair', 'default': {'first': 1}}}
+        overriding = {'pair': {'type': 'pair',
+                               'initial_default': {'second': 2}}}
+        data_types = {'pair': {'properties': {'first': {}, 'second': {}}}}
+        schemas = copy.deepcopy((overridden, overriding))
+        merged = utils.merge_schemas(overridden_schema=overridden,
+                                     overriding_schema=overriding,
+                                     data_types=data_types)
+        self.assertEqual({'first': 1, 'second': 2},
+                         merged['pair']['default'])
+        self.assertEqual(schemas, (overridden, overriding))
+
+    def test_fix_properties_keeps_schemas(self):
+        schema = {'default': 1, 'initial_default': 2}
+        value = {'properties': {'prop': schema}}
+        types.Type.fix_properties(value)
+        self.assertEqual({'prop': {'default': 1}}, value['properties'])
+        self.assertEqual({'default': 1, 'initial_default': 2}, schema)
+
+    def test_nodes_do_not_share_defaults(self):
+        yaml = self.BASIC_VERSION_SECTION_DSL_1_2 + """
+data_types:
+    pair:
+        properties:
+            first:
+                default: [1]
+node_types:
+    type:
+        properties:
+            pair:
+                type: pair
+                default: {}
+            list:
+                default: [a]
+node_templates:
+    node1:
+        type: type
+    node2:
+        type: type
+"""
+        nodes = self.parse(yaml)['nodes']
+        nodes[0]['properties']['pair']['first'].append(2)
+        nodes[0]['properties']['list'].append('b')
+        self.assertEqual({'pair': {'first': [1]}, 'list': ['a']},
+                         nodes[1]['properties'])
@@ -22,7 +22,8 @@ from dsl_parser.exceptions import DSLParsingLogicException
 from dsl_parser.import_resolver.default_import_resolver import \
     DefaultImportResolver, DefaultResolverValidationException
 from dsl_parser.import_resolver.abstract_import_resolver import \
-    MAX_NUMBER_RETRIES
+    MAX_NUMBER_RETRIES, ImportSession, read_import
+from dsl_parser import utils
 
 ORIGINAL_V1_URL = 'http://www.original_v1.org/cloudify/types.yaml'
 ORIGINAL_V1_PREFIX = 'http://www.original_v1.org'
@@ -185,9 +186,10 @@ class TestDefaultResolver(testtools.TestCase):
 
         class mock_requests_get(object):
 
-            def __init__(self, url, timeout):
+            def __init__(self, url, timeout, **kwargs):
                 self.status_code = 200
                 self.text = 200
+                self.headers = {}
                 number_of_attempts.append(1)
                 if url not in urls_to_resolve:
                     urls_to_resolve.append(url)
@@ -214,7 +216,7 @@ class TestDefaultResolver(testtools.TestCase):
                         return None
 
         resolver = DefaultImportResolver(rules=rules)
-        with mock.patch('requests.get', new=mock_requests_get,
+        with mock.patch('requests.Session.get', new=mock_requests_get,
                         create=True):
             with mock.patch(
                     'dsl_parser.import_resolver.abstract_import_resolver.'
@@ -244,6 +246,91 @@ class TestDefaultResolver(testtools.TestCase):
             self.assertEqual(MAX_NUMBER_RETRIES + 1, len(number_of_attempts))
 
 
+class TestImportSession(testtools.TestCase):
+
+    @staticmethod
+    def _response(status_code, text='', headers=None):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = text
+        response.raw = mock.Mock()
+        response.headers.update(headers or {})
+        return response
+
+    def test_conditional_get(self):
+        session = ImportSession()
+        requests_headers = []
+        responses = [
+            self._response(200, 'node_types: {}', {'ETag': '"v1"'}),
+            self._response(304)
+        ]
+
+        def mock_get(_, url, timeout, headers):
+            requests_headers.append(headers)
+            return responses.pop(0)
+
+        with mock.patch('requests.Session.get', new=mock_get):
+            first = read_import(VALID_V1_URL, session=session)
+            second = read_import(VALID_V1_URL, session=session)
+        self.assertEqual('node_types: {}', first)
+        self.assertEqual(first, second)
+        self.assertEqual([{}, {'If-None-Match': '"v1"'}], requests_headers)
+
+    def test_last_modified(self):
+        session = ImportSession()
+        requests_headers = []
+        last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+
+        def mock_get(_, url, timeout, headers):
+            requests_headers.append(headers)
+            return self._response(200, 'content',
+                                  {'Last-Modified': last_modified})
+
+        with mock.patch('requests.Session.get', new=mock_get):
+            read_import(VALID_V1_URL, session=session)
+            read_import(VALID_V1_URL, session=session)
+        self.assertEqual({'If-Modified-Since': last_modified},
+                         requests_headers[1])
+
+    def test_session_settings(self):
+        session = ImportSession(pool_size=3, timeout=7)
+        timeouts = []
+
+        def mock_get(_, url, timeout, headers):
+            timeouts.append(timeout)
+            return self._response(200, 'content')
+
+        with mock.patch('requests.Session.get', new=mock_get):
+            read_import(VALID_V1_URL, session=session)
+        self.assertEqual([7], timeouts)
+        adapter = session._session.get_adapter(VALID_V1_URL)
+        self.assertEqual(3, adapter._pool_maxsize)
+
+    def test_resolver_owns_session(self):
+        resolver = DefaultImportResolver(pool_size=2, request_timeout=3,
+                                         max_retries=1)
+        self.assertIsInstance(resolver.session, ImportSession)
+        self.assertEqual(3, resolver.session.timeout)
+        self.assertEqual(1, resolver.session.max_retries)
+
+    def test_url_exists(self):
+        session = ImportSession()
+
+        def mock_get(_, url, timeout, stream):
+            if url == VALID_V1_URL:
+                return self._response(200)
+            if url == INVALID_V1_URL:
+                return self._response(404)
+            raise requests.ConnectionError()
+
+        with mock.patch('requests.Session.get', new=mock_get):
+            self.assertTrue(utils.url_exists(VALID_V1_URL, session=session))
+            self.assertFalse(utils.url_exists(INVALID_V1_URL,
+                                              session=session))
+            self.assertFalse(utils.url_exists('http://timeout',
+                                              session=session))
+
+
 class TestDefaultResolverValidations(testtools.TestCase):
 
     def test_illegal_default_resolver_rules_type(self):
@@ -287,6 +374,14 @@ class TestDefaultResolverValidations(testtools.TestCase):
                 'pair but the rule {0} has 2 keys'
                 .format(rules), str(ex))
 
+    def test_illegal_default_resolver_fetch_concurrency(self):
+        for fetch_concurrency in [0, -1, '2', True]:
+            ex = self.assertRaises(DefaultResolverValidationException,
+                                   DefaultImportResolver,
+                                   fetch_concurrency=fetch_concurrency)
+            self.assertIn('The `fetch_concurrency` parameter must be a '
+                          'positive integer', str(ex))
+
     def test_illegal_default_resolver_parameters(self):
         # illegal initialization of the default resolver
         params = {
@@ -0,0 +1,70 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import testtools
+
+from dsl_parser.utils import find_cycle
+
+
+def _find_cycle(graph, nodes=None):
+    return find_cycle(nodes or sorted(graph),
+                      lambda node: graph.get(node, []))
+
+
+class TestFindCycle(testtools.TestCase):
+
+    def test_no_cycle(self):
+        self.assertIsNone(_find_cycle({}))
+        self.assertIsNone(_find_cycle({'a': ['b', 'c'],
+                                       'b': ['c'],
+                                       'c': []}))
+
+    def test_self_loop(self):
+        self.assertEqual(['b'], _find_cycle({'a': ['b'], 'b': ['b']}))
+
+    def test_shortest_cycle_through_first_cyclic_node(self):
+        graph = {'a': ['b'],
+                 'b': ['c', 'e'],
+                 'c': ['d'],
+                 'd': ['b'],
+                 'e': ['b']}
+        self.assertEqual(['b', 'e'], _find_cycle(graph))
+        self.assertEqual(['c', 'd', 'b'],
+                         _find_cycle(graph, nodes=['c', 'a', 'b']))
+
+    def test_cycle_outside_of_first_component(self):
+        graph = {'a': ['b'],
+                 'b': ['a'],
+                 'c': ['d'],
+                 'd': ['c']}
+        self.assertEqual(['c', 'd'],
+                         _find_cycle(graph, nodes=['c', 'a']))
+
+    def test_nodes_iterator(self):
+        graph = {'a': ['b'], 'b': ['a']}
+        self.assertEqual(['a', 'b'],
+                         find_cycle(iter(['a', 'b']), graph.get))
+
+    def test_complete_graph(self):
+        # has more simple cycles than could ever be enumerated
+        nodes = range(200)
+        graph = dict((node, [n for n in nodes if n != node])
+                     for node in nodes)
+        self.assertEqual([0, 1], _find_cycle(graph))
+
+    def test_long_cycle(self):
+        size = 100000
+        graph = dict((node, [(node + 1) % size]) for node in range(size))
+        self.assertEqual(range(size), _find_cycle(graph))
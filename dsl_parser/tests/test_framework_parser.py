@@ -15,7 +15,8 @@
 
 import testtools
 
-from dsl_parser import exceptions
+from dsl_parser import (exceptions,
+                        holder)
 
 from dsl_parser.framework import (parser,
                                   elements,
@@ -118,6 +119,49 @@ class TestSchemaSchemaValidation(testtools.TestCase):
         self.assert_invalid(TestList)
 
 
+class TestCompiledSchema(testtools.TestCase):
+
+    def test_compiled_once(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestElement(elements.Element):
+            schema = [
+                elements.Leaf(type=int),
+                {
+                    'leaf': TestLeaf
+                }
+            ]
+            requires = {
+                'self': ['value'],
+                TestLeaf: [requirements.Value('leaf_value')]
+            }
+
+        compiled = parser.compiled_schema(TestElement)
+        self.assertIs(compiled, parser.compiled_schema(TestElement))
+        self.assertTrue(compiled.is_union)
+        self.assertEqual(2, len(compiled.items))
+        self.assertEqual(1, len(compiled.traversal))
+        requires = dict(compiled.requires)
+        self.assertEqual(set([TestElement, TestLeaf]), set(requires))
+        self.assertEqual('value', requires[TestElement][0].name)
+        self.assertIsInstance(requires[TestElement][0],
+                              requirements.Requirement)
+
+    def test_validated_once(self):
+        class TestElement(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        validator = parser.SchemaAPIValidator()
+        validator.validate(TestElement)
+        TestElement.schema = 1
+        # the schema of a class is only validated the first time
+        validator.validate(TestElement)
+        self.assertRaises(exceptions.DSLParsingSchemaAPIException,
+                          parser.SchemaAPIValidator().validate,
+                          TestElement)
+
+
 class TestSchemaValidation(testtools.TestCase):
 
     def assert_valid(self, value, element_cls, strict=True):
@@ -279,6 +323,13 @@ class TestSchemaValidation(testtools.TestCase):
 
         self.assert_valid(['1'], TestElement)
         self.assert_invalid(['1', '2'], TestElement, error_code=100)
+        # a single (shortest) cycle is reported, without enumerating all of
+        # the cycles of the element graph
+        exc = self.assertRaises(exceptions.DSLParsingLogicException,
+                                parser.parse,
+                                value=[str(i) for i in range(30)],
+                                element_cls=TestElement)
+        self.assertEqual(['0', '1', '0'], exc.circular_dependency)
 
     def test_strict_validation(self):
         class TestLeaf(elements.Element):
@@ -313,3 +364,239 @@ class TestSchemaValidation(testtools.TestCase):
             {'child': 'value'},
             TestElement,
             error_code=exceptions.ERROR_CODE_ILLEGAL_VALUE_ACCESS)
+
+    def test_frozen_value_access(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=dict)
+
+            def calculate_provided(self):
+                return {'provided': {'key': 'value'}}
+
+        class TestElement(elements.Element):
+            schema = {
+                'leaf': TestLeaf
+            }
+            requires = {
+                TestLeaf: [requirements.Value('provided')]
+            }
+
+            def parse(self, provided):
+                leaf = self.child(TestLeaf)
+                initial_value = leaf.initial_value
+                initial_value['key'] = 'changed'
+                value = leaf.value
+                value['key'] = 'changed'
+                leaf.provided['provided']['key'] = 'changed'
+                return {
+                    'initial_value': leaf.frozen_initial_value,
+                    'value': leaf.frozen_value,
+                    'provided': leaf.frozen_provided,
+                    'initial_value_is_frozen': (leaf.frozen_initial_value is
+                                                leaf.frozen_initial_value),
+                    # requirements and dict results pass frozen values on
+                    'requirement_is_frozen': provided is leaf.frozen_value,
+                    'dict_result_is_frozen': (
+                        self.build_dict_result()['leaf'] is
+                        leaf.frozen_value)
+                }
+
+        result = parser.parse({'leaf': {'key': 'value'}}, TestElement)
+        self.assertEqual({
+            'initial_value': {'key': 'value'},
+            'value': {'key': 'value'},
+            'provided': {'provided': {'key': 'value'}},
+            'initial_value_is_frozen': True,
+            'requirement_is_frozen': True,
+            'dict_result_is_frozen': True
+        }, result)
+
+    def test_unshared_copy(self):
+        shared = {'a': [1, {'b': 'c'}]}
+        value = {'x': shared, 'y': [shared, (1, [2])], 'z': 'z'}
+        copied = elements.unshared_copy(value)
+        self.assertEqual(value, copied)
+        self.assertIsNot(copied['x'], copied['y'][0])
+        self.assertIsNot(copied['x']['a'], copied['y'][0]['a'])
+        self.assertIsNot(shared, copied['x'])
+        self.assertIsNot(value['y'][1][1], copied['y'][1][1])
+        copied['x']['a'][1]['b'] = 'changed'
+        self.assertEqual('c', copied['y'][0]['a'][1]['b'])
+        self.assertEqual('c', shared['a'][1]['b'])
+
+    def test_indexed_requirements(self):
+        def ref_names(source):
+            return [source.initial_value['ref']]
+
+        class TestItem(elements.Element):
+            schema = elements.Leaf(type=dict)
+            requires = {
+                'self': [requirements.Value(
+                    'refs',
+                    multiple_results=True,
+                    index=requirements.Index(ref_names))]
+            }
+
+            def parse(self, refs):
+                return {'ref': self.initial_value['ref'],
+                        'refs': [ref['ref'] for ref in refs]}
+
+        class TestFilteredItem(elements.Element):
+            schema = elements.Leaf(type=dict)
+            requires = {
+                TestItem: [requirements.Value(
+                    'refs',
+                    multiple_results=True,
+                    index=requirements.Index(ref_names),
+                    predicate=lambda source, target: target.name != 'b')]
+            }
+
+            def parse(self, refs):
+                return [ref['ref'] for ref in refs]
+
+        class TestItems(elements.DictElement):
+            schema = elements.Dict(type=TestItem)
+
+        class TestFilteredItems(elements.DictElement):
+            schema = elements.Dict(type=TestFilteredItem)
+
+        class TestElement(elements.DictElement):
+            schema = {
+                'items': TestItems,
+                'filtered': TestFilteredItems
+            }
+
+        result = parser.parse({
+            'items': {'a': {'ref': 'b'},
+                      'b': {'ref': 'c'},
+                      'c': {'ref': 'missing'},
+                      'd': {'ref': ['unhashable']}},
+            'filtered': {'e': {'ref': 'b'},
+                         'f': {'ref': 'c'}}
+        }, TestElement)
+        self.assertEqual(['c'], result['items']['a']['refs'])
+        self.assertEqual(['missing'], result['items']['b']['refs'])
+        self.assertEqual([], result['items']['c']['refs'])
+        self.assertEqual([], result['items']['d']['refs'])
+        self.assertEqual({'e': [], 'f': ['missing']}, result['filtered'])
+
+    def test_dependency_requirement(self):
+        parse_order = []
+
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+            def parse(self):
+                parse_order.append(self.name)
+                return self.initial_value
+
+        class TestOther(TestLeaf):
+            requires = {
+                TestLeaf: [requirements.Dependency(
+                    index=requirements.sibling_index)]
+            }
+
+        class TestItem(elements.DictElement):
+            schema = {
+                'leaf': TestLeaf,
+                'other': TestOther
+            }
+
+        class TestElement(elements.DictElement):
+            schema = elements.List(type=TestItem)
+
+        result = parser.parse([{'leaf': 'a', 'other': 'b'}], TestElement)
+        self.assertEqual({0: {'leaf': 'a', 'other': 'b'}}, result)
+        self.assertEqual(['leaf', 'other'], parse_order)
+
+
+class TestElementTree(testtools.TestCase):
+
+    def test_navigation(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestOtherLeaf(TestLeaf):
+            pass
+
+        class TestList(elements.Element):
+            schema = elements.List(type=TestLeaf)
+
+        class TestElement(elements.Element):
+            schema = {
+                'list': TestList,
+                'other': TestOtherLeaf
+            }
+
+        context = parser.Context(
+            value={'list': ['a', 'b', 'c'], 'other': 'd'},
+            element_cls=TestElement,
+            element_name='root',
+            inputs=None)
+        root = context._root_element
+        element_list = root.child(TestList)
+        items = element_list.children()
+        self.assertEqual([0, 1, 2], [item.name for item in items])
+        self.assertEqual('list.1', items[1].path)
+        self.assertIs(element_list, items[1].parent())
+        self.assertIs(root, items[1].ancestor(TestElement))
+        other = element_list.sibling(TestOtherLeaf)
+        self.assertEqual('other', other.name)
+        # children are matched by subclass
+        self.assertIs(other, root.child(TestLeaf))
+        self.assertRaises(exceptions.DSLParsingElementMatchException,
+                          element_list.child, TestLeaf)
+        self.assertEqual(set(items + [other]),
+                         set(root.descendants(TestLeaf)))
+        self.assertEqual(5, len(root.descendants(elements.Element)))
+
+    def test_topological_sort(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestOther(TestLeaf):
+            requires = {
+                TestLeaf: []
+            }
+
+        class TestElement(elements.Element):
+            schema = {
+                'other': TestOther,
+                'leaf': TestLeaf
+            }
+
+        context = parser.Context(value={'other': 'a', 'leaf': 'b'},
+                                 element_cls=TestElement,
+                                 element_name='root',
+                                 inputs=None)
+        order = [e.name for e in context.elements_graph_topological_sort()]
+        self.assertEqual('root', order[-1])
+        self.assertLess(order.index('leaf'), order.index('other'))
+
+    def test_lazy_initial_value(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=dict)
+
+        class TestElement(elements.Element):
+            schema = elements.Dict(type=TestLeaf)
+
+        shared = holder.Holder.of({'key': 'value'})
+        value = holder.Holder.of({'a': {'key': 'value'}})
+        value.set_item(holder.Holder('b'), shared)
+        value.set_item(holder.Holder('c'), shared)
+        context = parser.Context(value=value,
+                                 element_cls=TestElement,
+                                 element_name='root',
+                                 inputs=None)
+        root = context._root_element
+        self.assertIs(elements.UNRESTORED, root._initial_value)
+        children = dict((child.name, child) for child in root.children())
+        for child in children.values():
+            self.assertEqual({'key': 'value'}, child.frozen_initial_value)
+        restored = root.frozen_initial_value
+        self.assertEqual({'a': {'key': 'value'},
+                          'b': {'key': 'value'},
+                          'c': {'key': 'value'}}, restored)
+        # restored child values are reused
+        self.assertIs(children['a'].frozen_initial_value, restored['a'])
+        # unless the same holder appears more than once
+        self.assertIsNot(restored['b'], restored['c'])
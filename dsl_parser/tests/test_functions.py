@@ -13,9 +13,17 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import copy
+import json
+
+import testtools
 from testtools import ExpectedException
 
-from dsl_parser import exceptions
+from dsl_parser import (constants,
+                        exceptions,
+                        functions,
+                        models,
+                        scan)
 from dsl_parser.tasks import prepare_deployment_plan
 from dsl_parser.tests.abstract_test_parser import AbstractTestParser
 from dsl_parser.tests.abstract_test_parser import timeout
@@ -741,6 +749,167 @@ node_templates:
 """
         prepare_deployment_plan(self.parse(yaml))
 
+    def test_not_circular_shared_reference(self):
+        yaml = """
+node_types:
+    vm_type:
+        properties:
+            a: { type: string }
+            b: { type: string }
+            c: { type: string }
+node_templates:
+    vm:
+        type: vm_type
+        properties:
+            a: { get_property: [SELF, b] }
+            b: [ { get_property: [SELF, c] }, { get_property: [SELF, c] } ]
+            c: 1
+"""
+        plan = prepare_deployment_plan(self.parse(yaml))
+        self.assertEqual([1, 1], plan.node_templates[0]['properties']['a'])
+
+    def test_circular_get_property_reports_cycle_only(self):
+        yaml = """
+node_types:
+    vm_type:
+        properties:
+            a: { type: string }
+            b: { type: string }
+            c: { type: string }
+node_templates:
+    vm1:
+        type: vm_type
+        properties:
+            a: { get_property: [vm2, a] }
+            b: 1
+            c: 1
+    vm2:
+        type: vm_type
+        properties:
+            a: { get_property: [vm2, b] }
+            b: { get_property: [vm2, c] }
+            c: { get_property: [vm2, b] }
+"""
+        with ExpectedException(RuntimeError,
+                               'Circular get_property function call '
+                               'detected: vm2.b -> vm2.c -> vm2.b'):
+            self.parse(yaml)
+
+    def test_unhashable_node_reference(self):
+        yaml = """
+node_types:
+    vm_type:
+        properties:
+            a: {}
+node_templates:
+    vm:
+        type: vm_type
+        properties:
+            a: { get_property: [ [vm], a ] }
+"""
+        with ExpectedException(KeyError, ".*does not exist.*"):
+            self.parse(yaml)
+
+
+class TestPlanEvaluationMemo(AbstractTestParser):
+
+    def test_shared_property_resolved_once(self):
+        yaml = """
+node_types:
+    type:
+        properties:
+            settings:
+                default: {}
+node_templates:
+    config:
+        type: type
+        properties:
+            settings:
+                port: 8080
+                url: { concat: [host, ':', { get_property: [SELF, settings,
+                                                            port] }] }
+    server1:
+        type: type
+        properties:
+            settings: { get_property: [config, settings] }
+    server2:
+        type: type
+        properties:
+            settings: { get_property: [config, settings] }
+    server3:
+        type: type
+        properties:
+            settings: { get_property: [config, settings] }
+"""
+        plan = models.Plan(copy.deepcopy(self.parse_1_1(yaml)))
+        handler = functions.plan_evaluation_handler(plan)
+        scan.scan_service_template(plan, handler, replace=True)
+        for node in plan.node_templates:
+            self.assertEqual({'port': 8080, 'url': 'host:8080'},
+                             node['properties']['settings'])
+        self.assertEqual(2, handler.memo_hits)
+
+    def test_self_resolved_in_referenced_node(self):
+        yaml = """
+node_types:
+    type:
+        properties:
+            property: {}
+            value: {}
+node_templates:
+    a_node:
+        type: type
+        properties:
+            property: { get_property: [z_node, property] }
+            value: a_value
+    z_node:
+        type: type
+        properties:
+            property: { get_property: [SELF, value] }
+            value: z_value
+"""
+        plan = prepare_deployment_plan(self.parse(yaml))
+        a_node = self.get_node_by_name(plan, 'a_node')
+        self.assertEqual('z_value', a_node['properties']['property'])
+
+    def test_circular_reference_through_input(self):
+        yaml = """
+inputs:
+    input:
+        default: { get_property: [SELF, property] }
+node_types:
+    type:
+        properties:
+            property: {}
+node_templates:
+    node:
+        type: type
+        properties:
+            property: { get_input: input }
+"""
+        plan = self.parse(yaml)
+        ex = self.assertRaises(RuntimeError, prepare_deployment_plan, plan)
+        self.assertIn('node.property -> node.property', str(ex))
+
+
+class TestPlanNodeTemplateIndex(testtools.TestCase):
+
+    def test_lookup(self):
+        plan = models.Plan({'nodes': [{'id': 'a', 'name': 'a_name'},
+                                      {'id': 'b', 'name': 'b_name'},
+                                      {'id': 'a', 'name': 'duplicate'}]})
+        self.assertEqual('a_name', plan.node_templates_by_id['a']['name'])
+        self.assertEqual('b', plan.node_templates_by_name['b_name']['id'])
+        self.assertNotIn('c', plan.node_templates_by_id)
+
+    def test_rebuilt_when_nodes_change(self):
+        plan = models.Plan({'nodes': [{'id': 'a', 'name': 'a'}]})
+        self.assertNotIn('b', plan.node_templates_by_id)
+        plan['nodes'].append({'id': 'b', 'name': 'b'})
+        self.assertIn('b', plan.node_templates_by_id)
+        plan['nodes'] = [{'id': 'c', 'name': 'c'}]
+        self.assertEqual(['c'], plan.node_templates_by_id.keys())
+
 
 class TestGetAttribute(AbstractTestParser):
 
@@ -1137,3 +1306,202 @@ outputs:
                          ['one', 'value', {'get_attribute': ['node',
                                                              'attribute']}]},
                          outputs['output3']['value'])
+
+
+class TestFunctionSites(AbstractTestParser):
+
+    yaml = """
+node_types:
+    type:
+        properties:
+            property: {}
+            list: {}
+node_templates:
+    node:
+        type: type
+        properties:
+            property: value
+            list:
+                - item
+                - { get_property: [SELF, property] }
+        interfaces:
+            interface:
+                op:
+                    implementation: test_plugin.op
+                    inputs:
+                        input: { get_attribute: [SELF, attribute] }
+                        other: value
+    other_node:
+        type: type
+        properties:
+            property: { concat: [{ get_property: [node, property] }, x] }
+            list: []
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: node
+                source_interfaces:
+                    interface:
+                        op:
+                            implementation: test_plugin.op
+                            inputs:
+                                input: { get_property: [TARGET, property] }
+outputs:
+    output:
+        value: { get_property: [node, property] }
+    plain_output:
+        value: value
+"""
+
+    def _parse(self):
+        return self.parse_1_1(self.yaml + self.BASIC_PLUGIN + """
+relationships:
+    cloudify.relationships.contained_in: {}
+""")
+
+    def _function_paths(self, plan, function_sites=None):
+        paths = []
+
+        def handler(v, scope, context, path):
+            paths.append(path)
+            if functions.is_function(v):
+                return {'evaluated': path}
+            return v
+        scan.scan_service_template(copy.deepcopy(plan), handler,
+                                   replace=True,
+                                   function_sites=function_sites,
+                                   is_function=functions.is_function)
+        return paths
+
+    def test_index(self):
+        plan = self._parse()
+        node_index = [n['name'] for n in plan.node_templates].index('node')
+        other_index = 1 - node_index
+        function_sites = dict(
+            (tuple(key_path), sites)
+            for key_path, _, sites in plan[constants.FUNCTION_SITES]
+            if sites)
+        self.assertEqual({
+            ('nodes', node_index, 'properties'): [['list', 1]],
+            ('nodes', node_index, 'operations', 'interface.op', 'inputs'):
+                [['input']],
+            ('nodes', node_index, 'operations', 'op', 'inputs'): [['input']],
+            ('nodes', other_index, 'properties'): [['property']],
+            ('nodes', other_index, 'relationships', 0, 'source_operations',
+             'interface.op', 'inputs'): [['input']],
+            ('nodes', other_index, 'relationships', 0, 'source_operations',
+             'op', 'inputs'): [['input']],
+            ('outputs', 'output'): [['value']]
+        }, function_sites)
+        # function free values have an entry too
+        entries = dict(
+            (tuple(key_path), (digest, sites))
+            for key_path, digest, sites in plan[constants.FUNCTION_SITES])
+        self.assertEqual(
+            (scan.value_digest(plan['outputs']['plain_output']), []),
+            entries[('outputs', 'plain_output')])
+        self.assertEqual(
+            scan.value_digest(plan['outputs']['output']),
+            entries[('outputs', 'output')][0])
+
+    def test_scan_visits_sites_only(self):
+        plan = self._parse()
+        all_paths = self._function_paths(plan)
+        site_paths = self._function_paths(plan,
+                                          plan[constants.FUNCTION_SITES])
+        self.assertLess(len(site_paths), len(all_paths))
+        self.assertTrue(set(site_paths).issubset(set(all_paths)))
+        self.assertIn('node.properties.list[1]', site_paths)
+        self.assertIn('other_node.properties.property.concat[0]',
+                      site_paths)
+        self.assertIn('outputs.output.value', site_paths)
+        self.assertNotIn('node.properties.list[0]', site_paths)
+        self.assertNotIn('outputs.plain_output.value', site_paths)
+        # the index applies to serialized plans as well
+        serialized = models.Plan(json.loads(json.dumps(plan)))
+        site_paths = self._function_paths(
+            serialized, serialized[constants.FUNCTION_SITES])
+        self.assertLess(len(site_paths),
+                        len(self._function_paths(serialized)))
+        self.assertIn('node.properties.list[1]', site_paths)
+        self.assertNotIn('outputs.plain_output.value', site_paths)
+
+    def test_stale_index_falls_back_to_full_scan(self):
+        plan = self._parse()
+        node = self.get_node_by_name(plan, 'node')
+        node['properties']['list'].pop(0)
+        deployment_plan = prepare_deployment_plan(plan)
+        node = self.get_node_by_name(deployment_plan, 'node')
+        self.assertEqual(['value'], node['properties']['list'])
+
+    def test_function_moved_in_list(self):
+        plan = self._parse()
+        node = self.get_node_by_name(plan, 'node')
+        # the indexed site is the second item of the list
+        node['properties']['list'] = [
+            'item', {'get_property': ['SELF', 'property']}, 'other']
+        node['properties']['list'].pop(0)
+        deployment_plan = prepare_deployment_plan(plan)
+        node = self.get_node_by_name(deployment_plan, 'node')
+        self.assertEqual(['value', 'other'], node['properties']['list'])
+
+    def test_node_added_to_serialized_plan(self):
+        plan = self._parse()
+        plan = models.Plan(json.loads(json.dumps(plan)))
+        node = copy.deepcopy(self.get_node_by_name(plan, 'node'))
+        node['name'] = node['id'] = 'new_node'
+        node['properties']['property'] = {
+            'get_property': ['node', 'property']}
+        plan['nodes'].append(node)
+        deployment_plan = prepare_deployment_plan(plan)
+        node = self.get_node_by_name(deployment_plan, 'new_node')
+        self.assertEqual('value', node['properties']['property'])
+
+    def test_function_added_to_indexed_value(self):
+        for serialize in [False, True]:
+            plan = self._parse()
+            if serialize:
+                plan = models.Plan(json.loads(json.dumps(plan)))
+            node = self.get_node_by_name(plan, 'node')
+            node['properties']['extra'] = {
+                'get_property': ['SELF', 'property']}
+            deployment_plan = prepare_deployment_plan(plan)
+            node = self.get_node_by_name(deployment_plan, 'node')
+            self.assertEqual('value', node['properties']['extra'])
+            self.assertEqual(['item', 'value'], node['properties']['list'])
+
+    def test_function_added_to_function_free_value_with_index(self):
+        for serialize in [False, True]:
+            plan = self._parse()
+            if serialize:
+                plan = models.Plan(json.loads(json.dumps(plan)))
+            plan['outputs']['plain_output']['value'] = {
+                'x': {'get_property': ['node', 'property']}}
+            deployment_plan = prepare_deployment_plan(plan)
+            self.assertEqual(
+                {'x': 'value'},
+                deployment_plan['outputs']['plain_output']['value'])
+
+    def test_deepcopied_plan_without_index(self):
+        plan = copy.deepcopy(self._parse())
+        del plan[constants.FUNCTION_SITES]
+        deployment_plan = prepare_deployment_plan(plan)
+        node = self.get_node_by_name(deployment_plan, 'node')
+        self.assertEqual(['item', 'value'], node['properties']['list'])
+
+    def test_function_added_to_function_free_value(self):
+        plan = self._parse()
+        del plan[constants.FUNCTION_SITES]
+        plan['outputs']['plain_output']['value'] = {
+            'x': {'get_property': ['node', 'property']}}
+        deployment_plan = prepare_deployment_plan(plan)
+        self.assertEqual({'x': 'value'},
+                         deployment_plan['outputs']['plain_output']['value'])
+
+    def test_prepare_deployment_plan_without_index(self):
+        plan = self._parse()
+        expected = prepare_deployment_plan(plan)
+        del plan[constants.FUNCTION_SITES]
+        actual = prepare_deployment_plan(plan)
+        # node instance ids are random, compare the evaluated values only
+        self.assertEqual(expected['nodes'], actual['nodes'])
+        self.assertEqual(expected['outputs'], actual['outputs'])
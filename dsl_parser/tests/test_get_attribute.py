@@ -493,6 +493,169 @@ class TestEvaluateFunctions(AbstractTestParser):
                                          get_node_instance,
                                          None)
 
+    def test_bulk_prefetch(self):
+        node_instances = {
+            'node1_1': NodeInstance({
+                'id': 'node1_1',
+                'node_id': 'node1',
+                'runtime_properties': {'a': 'a_val'},
+                'relationships': [{'target_name': 'node2',
+                                   'target_id': 'node2_1'}]
+            }),
+            'node2_1': NodeInstance({
+                'id': 'node2_1',
+                'node_id': 'node2',
+                'runtime_properties': {}
+            }),
+            'node3_1': NodeInstance({
+                'id': 'node3_1',
+                'node_id': 'node3',
+                'runtime_properties': {'c': 'c_val'}
+            })
+        }
+        nodes = {
+            'node1': Node({'id': 'node1'}),
+            'node2': Node({'id': 'node2', 'properties': {'b': 'b_val'}}),
+            'node3': Node({'id': 'node3'})
+        }
+        bulk_calls = []
+
+        def get_node_instances_bulk(node_ids, node_instance_ids):
+            bulk_calls.append(('node_instances',
+                               sorted(node_ids),
+                               sorted(node_instance_ids)))
+            return [node_instance
+                    for node_instance in node_instances.values()
+                    if node_instance.node_id in node_ids or
+                    node_instance.id in node_instance_ids]
+
+        def get_nodes_bulk(node_ids):
+            bulk_calls.append(('nodes', sorted(node_ids)))
+            return [nodes[node_id] for node_id in node_ids]
+
+        def fail(*args):
+            self.fail('unexpected call: {0}'.format(args))
+
+        payload = {
+            'a': {'get_attribute': ['SELF', 'a']},
+            'b': {'get_attribute': ['node2', 'b']},
+            'c': {'concat': [{'get_attribute': ['node3', 'c']}]}
+        }
+        functions.evaluate_functions(
+            payload,
+            {'self': 'node1_1'},
+            fail, fail, fail,
+            get_node_instances_bulk_method=get_node_instances_bulk,
+            get_nodes_bulk_method=get_nodes_bulk)
+
+        self.assertEqual({'a': 'a_val', 'b': 'b_val', 'c': 'c_val'},
+                         payload)
+        self.assertEqual([
+            ('node_instances', ['node2', 'node3'], ['node1_1']),
+            ('nodes', ['node1', 'node2', 'node3'])
+        ], bulk_calls)
+
+    def test_get_runtime_references(self):
+        payload = {
+            'a': {'get_attribute': ['SELF', 'a']},
+            'b': [{'get_attribute': ['node2', 'b']}],
+            'c': {'concat': [{'get_attribute': ['node3', 'c']}, 'd']},
+            'd': {'get_property': ['node4', 'd']}
+        }
+        self.assertEqual(
+            (set(['node2', 'node3']), set(['node1_1', 'node3_1'])),
+            functions.get_runtime_references(
+                payload, {'self': 'node1_1', 'target': 'node3_1'}))
+        self.assertEqual((set(), set()),
+                         functions.get_runtime_references({'a': 'b'},
+                                                          {'self': 'x'}))
+
+    def test_bulk_prefetch_falls_back(self):
+        def get_node_instances_bulk(node_ids, node_instance_ids):
+            return []
+
+        def get_node_instance(node_instance_id):
+            return NodeInstance({'id': node_instance_id,
+                                 'node_id': 'node1',
+                                 'runtime_properties': {'a': 'a_val'}})
+
+        def get_node(node_id):
+            return Node({'id': node_id})
+
+        payload = {'a': {'get_attribute': ['SELF', 'a']}}
+        functions.evaluate_functions(
+            payload, {'self': 'node1_1'}, None, get_node_instance, get_node,
+            get_node_instances_bulk_method=get_node_instances_bulk)
+        self.assertEqual('a_val', payload['a'])
+
+
+class TestRuntimeEvaluationStorage(testtools.TestCase):
+
+    def test_ancestry(self):
+        node_instances = {
+            'host_1': NodeInstance({
+                'id': 'host_1',
+                'node_id': 'host',
+                'scaling_groups': [{'name': 'g1', 'id': 'g1_1'}]
+            }),
+            'app_1': NodeInstance({
+                'id': 'app_1',
+                'node_id': 'app',
+                'scaling_groups': [{'name': 'g2', 'id': 'g2_1'},
+                                   {'name': 'g1', 'id': 'g1_2'}],
+                'relationships': [{'target_name': 'host',
+                                   'target_id': 'host_1'}]
+            }),
+            'module_1': NodeInstance({
+                'id': 'module_1',
+                'node_id': 'module',
+                'relationships': [{'target_name': 'app',
+                                   'target_id': 'app_1'}]
+            })
+        }
+        contained_in = {'type_hierarchy': [constants.CONTAINED_IN_REL_TYPE]}
+        nodes = {
+            'host': Node({'id': 'host'}),
+            'app': Node({'id': 'app', 'relationships': [
+                dict(contained_in, target_id='host')]}),
+            'module': Node({'id': 'module', 'relationships': [
+                dict(contained_in, target_id='app')]})
+        }
+        fetched = []
+
+        def get_node_instance(node_instance_id):
+            fetched.append(node_instance_id)
+            return node_instances[node_instance_id]
+
+        storage = functions.RuntimeEvaluationStorage(
+            get_node_instances_method=None,
+            get_node_instance_method=get_node_instance,
+            get_node_method=nodes.get)
+        ancestry = storage.get_ancestry('module_1')
+        self.assertEqual((['g2', 'g1', 'g1'], {'g1': 'g1_2', 'g2': 'g2_1'}),
+                         ancestry)
+        self.assertEqual((['g1'], {'g1': 'g1_1'}),
+                         storage.get_ancestry('host_1'))
+        self.assertIs(ancestry, storage.get_ancestry('module_1'))
+        self.assertEqual(['module_1', 'app_1', 'host_1'], fetched)
+
+    def test_group_node_instances(self):
+        node_instances = [
+            NodeInstance({'id': 'node_{0}'.format(i),
+                          'node_id': 'node',
+                          'scaling_groups': [{'name': 'g',
+                                              'id': 'g_{0}'.format(i % 2)}]})
+            for i in range(4)]
+        storage = functions.RuntimeEvaluationStorage(
+            get_node_instances_method=lambda node_id: node_instances,
+            get_node_instance_method=None,
+            get_node_method=lambda node_id: Node({'id': node_id}))
+        self.assertEqual(['node_1', 'node_3'],
+                         [i.id for i in storage.get_group_node_instances(
+                             'node', 'g', 'g_1')])
+        self.assertEqual([], storage.get_group_node_instances(
+            'node', 'g', 'g_2'))
+
 
 class NodeInstance(dict):
 
@@ -0,0 +1,68 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import copy
+
+import testtools
+
+from dsl_parser.holder import Holder
+
+
+class TestHolder(testtools.TestCase):
+
+    def test_no_instance_dict(self):
+        value_holder = Holder('value', 1, 2, 3, 4, filename='a.yaml')
+        self.assertFalse(hasattr(value_holder, '__dict__'))
+        self.assertRaises(AttributeError, setattr, value_holder, 'other', 1)
+
+    def test_deepcopy(self):
+        original = Holder.of({'key': ['value']}, filename='a.yaml')
+        original.start_line = 5
+        copied = copy.deepcopy(original)
+        self.assertEqual({'key': ['value']}, copied.restore())
+        self.assertEqual((5, 'a.yaml'), (copied.start_line, copied.filename))
+        _, value_holder = copied.get_item('key')
+        value_holder.value.append(Holder('other'))
+        self.assertEqual({'key': ['value']}, original.restore())
+
+    def test_get_item(self):
+        dict_holder = Holder.of({'a': 1, 'b': 2})
+        key_holder, value_holder = dict_holder.get_item('b')
+        self.assertEqual(('b', 2), (key_holder.value, value_holder.value))
+        self.assertEqual((None, None), dict_holder.get_item('c'))
+        self.assertEqual((None, None), dict_holder.get_item(['unhashable']))
+        self.assertIn('a', dict_holder)
+        self.assertNotIn('c', dict_holder)
+        self.assertRaises(ValueError, Holder.of([]).get_item, 'a')
+
+    def test_set_item(self):
+        dict_holder = Holder.of({'a': 1})
+        self.assertNotIn('b', dict_holder)
+        dict_holder.set_item(Holder('b'), Holder(2))
+        self.assertEqual(2, dict_holder.get_item('b')[1].value)
+        original_key_holder, _ = dict_holder.get_item('a')
+        dict_holder.set_item(Holder('a'), Holder(3))
+        key_holder, value_holder = dict_holder.get_item('a')
+        self.assertIs(original_key_holder, key_holder)
+        self.assertEqual(3, value_holder.value)
+
+    def test_key_index_follows_direct_changes(self):
+        dict_holder = Holder.of({'a': 1})
+        self.assertNotIn('b', dict_holder)
+        dict_holder.value[Holder('b')] = Holder(2)
+        self.assertIn('b', dict_holder)
+        dict_holder.value = {Holder('c'): Holder(3)}
+        self.assertNotIn('a', dict_holder)
+        self.assertIn('c', dict_holder)
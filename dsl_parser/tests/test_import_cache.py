@@ -0,0 +1,228 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import datetime
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+import fixtures
+import testtools
+
+from dsl_parser import holder
+from dsl_parser.import_cache import (LRUImportCache,
+                                     DiskImportCache,
+                                     content_digest,
+                                     copy_holder,
+                                     warm_import_cache,
+                                     main as import_cache_main)
+from dsl_parser.parser import parse as dsl_parse
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+
+
+class TestLRUImportCache(testtools.TestCase):
+
+    def test_miss_and_hit(self):
+        cache = LRUImportCache()
+        parsed = holder.Holder.of({'key': 'value'}, filename='a.yaml')
+        self.assertIsNone(cache.get('file:a.yaml', 'digest'))
+        cache.put('file:a.yaml', 'digest', parsed, size=10)
+        cached = cache.get('file:a.yaml', 'digest')
+        self.assertEqual({'key': 'value'}, cached.restore())
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_digest_mismatch_is_a_miss(self):
+        cache = LRUImportCache()
+        cache.put('file:a.yaml', 'digest1', holder.Holder.of({}), size=10)
+        self.assertIsNone(cache.get('file:a.yaml', 'digest2'))
+
+    def test_copies_are_independent(self):
+        cache = LRUImportCache()
+        parsed = holder.Holder.of({'key': {'nested': 'value'}})
+        cache.put('file:a.yaml', 'digest', parsed, size=10)
+        first = cache.get('file:a.yaml', 'digest')
+        _, nested = first.get_item('key')
+        nested.value[holder.Holder('other')] = holder.Holder('value')
+        second = cache.get('file:a.yaml', 'digest')
+        self.assertEqual({'key': {'nested': 'value'}}, second.restore())
+
+    def test_copy_replaces_filename(self):
+        cache = LRUImportCache()
+        cache.put('file:a.yaml', 'digest',
+                  holder.Holder.of({'key': 'value'}, filename='a.yaml'),
+                  size=10)
+        cached = cache.get('file:a.yaml', 'digest', filename='other.yaml')
+        key_holder, value_holder = cached.get_item('key')
+        self.assertEqual('other.yaml', cached.filename)
+        self.assertEqual('other.yaml', key_holder.filename)
+        self.assertEqual('other.yaml', value_holder.filename)
+
+    def test_lru_eviction_by_size(self):
+        cache = LRUImportCache(max_size_bytes=25)
+        cache.put('url1', 'd', holder.Holder.of({}), size=10)
+        cache.put('url2', 'd', holder.Holder.of({}), size=10)
+        # touch url1 so url2 becomes the least recently used entry
+        cache.get('url1', 'd')
+        cache.put('url3', 'd', holder.Holder.of({}), size=10)
+        self.assertIsNotNone(cache.get('url1', 'd'))
+        self.assertIsNone(cache.get('url2', 'd'))
+        self.assertIsNotNone(cache.get('url3', 'd'))
+        stats = cache.stats()
+        self.assertEqual(1, stats['evictions'])
+        self.assertEqual(2, stats['entries'])
+        self.assertEqual(20, stats['size_bytes'])
+
+    def test_entry_larger_than_budget_is_not_cached(self):
+        cache = LRUImportCache(max_size_bytes=5)
+        cache.put('url', 'd', holder.Holder.of({}), size=10)
+        self.assertEqual(0, len(cache))
+
+    def test_content_digest(self):
+        self.assertEqual(content_digest('abc'), content_digest(u'abc'))
+        self.assertNotEqual(content_digest('abc'), content_digest('abd'))
+
+    def test_copy_holder_keeps_marks(self):
+        item = holder.Holder('a', 1, 2, 3, 4, filename='a.yaml')
+        original = holder.Holder(value=[item],
+                                 start_line=0, start_column=1,
+                                 end_line=5, end_column=6,
+                                 filename='a.yaml')
+        copied = copy_holder(original)
+        self.assertIsNot(original.value, copied.value)
+        item = copied.value[0]
+        self.assertEqual((1, 2, 3, 4, 'a.yaml'),
+                         (item.start_line, item.start_column,
+                          item.end_line, item.end_column, item.filename))
+
+
+class TestDiskImportCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestDiskImportCache, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def test_persisted_across_instances(self):
+        parsed = holder.Holder(
+            value={holder.Holder('key', 1, 2, 1, 5):
+                   holder.Holder([holder.Holder(1, 1, 7, 1, 8)],
+                                 1, 6, 1, 9)},
+            start_line=1, start_column=0, end_line=2, end_column=0,
+            filename='a.yaml')
+        DiskImportCache(self.cache_dir).put('file:a.yaml', 'digest', parsed,
+                                            size=10)
+        cache = DiskImportCache(self.cache_dir)
+        cached = cache.get('file:a.yaml', 'digest')
+        self.assertEqual({'key': [1]}, cached.restore())
+        key_holder, value_holder = cached.get_item('key')
+        self.assertEqual((1, 2, 1, 5, 'a.yaml'),
+                         (key_holder.start_line, key_holder.start_column,
+                          key_holder.end_line, key_holder.end_column,
+                          key_holder.filename))
+        self.assertEqual((1, 7), (value_holder.value[0].start_line,
+                                  value_holder.value[0].start_column))
+        self.assertEqual(1, cache.stats()['hits'])
+
+    def test_digest_mismatch_invalidates(self):
+        cache = DiskImportCache(self.cache_dir)
+        cache.put('file:a.yaml', 'digest1', holder.Holder.of({}), size=10)
+        self.assertIsNone(cache.get('file:a.yaml', 'digest2'))
+        self.assertIsNone(cache.get('file:a.yaml', 'digest1'))
+        self.assertEqual(1, cache.stats()['invalidations'])
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_corrupted_entry_is_a_miss(self):
+        cache = DiskImportCache(self.cache_dir)
+        cache.put('file:a.yaml', 'digest', holder.Holder.of({}), size=10)
+        entry_path = os.path.join(self.cache_dir,
+                                  os.listdir(self.cache_dir)[0])
+        with open(entry_path, 'wb') as f:
+            f.write('corrupted')
+        self.assertIsNone(cache.get('file:a.yaml', 'digest'))
+
+    def test_unencodable_values_are_not_persisted(self):
+        cache = DiskImportCache(self.cache_dir)
+        cache.put('file:a.yaml', 'digest',
+                  holder.Holder.of({'key': datetime.datetime.now()}),
+                  size=10)
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_warm(self):
+        import_path = os.path.join(self.cache_dir, 'types.yaml')
+        with open(import_path, 'w') as f:
+            f.write('node_types: {}')
+        import_url = 'file:{0}'.format(import_path)
+        cache = DiskImportCache(os.path.join(self.cache_dir, 'store'))
+        self.assertEqual([import_url], warm_import_cache(cache, [import_url]))
+        self.assertEqual([], warm_import_cache(cache, [import_url]))
+        cached = cache.get(import_url, content_digest('node_types: {}'))
+        self.assertEqual({'node_types': {}}, cached.restore())
+
+    def test_warm_cli(self):
+        import_path = os.path.join(self.cache_dir, 'types.yaml')
+        with open(import_path, 'w') as f:
+            f.write('node_types: {}')
+        store = os.path.join(self.cache_dir, 'store')
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', StringIO()))
+        import_cache_main(['--cache-dir', store, import_path])
+        self.assertEqual(1, len(os.listdir(store)))
+
+
+class TestParseWithImportCache(AbstractTestParser):
+
+    def test_imports_loaded_once_across_parses(self):
+        imported = self.BASIC_PLUGIN + self.BASIC_TYPE
+        yaml = self.BASIC_VERSION_SECTION_DSL_1_0 + \
+            self.create_yaml_with_imports([imported]) + \
+            self.BASIC_NODE_TEMPLATES_SECTION
+        cache = LRUImportCache()
+        first_plan = dsl_parse(yaml, import_cache=cache)
+        self.assertEqual(0, cache.hits)
+        self.assertEqual(1, cache.misses)
+        second_plan = dsl_parse(yaml, import_cache=cache)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(first_plan, second_plan)
+
+    def test_merge_does_not_leak_into_cache(self):
+        import_url = self.make_yaml_file("""
+node_types:
+    imported_type: {}
+""")
+        main_yaml = self.BASIC_VERSION_SECTION_DSL_1_0 + """
+imports:
+    -   {0}
+node_types:
+    test_type: {{}}
+node_templates:
+    test_node:
+        type: test_type
+""".format(import_url)
+        # test_type was merged into the imported node_types of the previous
+        # parse, it must not be visible to the next one
+        other_yaml = self.BASIC_VERSION_SECTION_DSL_1_0 + """
+imports:
+    -   {0}
+node_templates:
+    test_node:
+        type: test_type
+""".format(import_url)
+        cache = LRUImportCache()
+        dsl_parse(main_yaml, import_cache=cache)
+        self._assert_dsl_parsing_exception_error_code(
+            other_yaml, 7,
+            parsing_method=lambda dsl: dsl_parse(dsl, import_cache=cache))
+        self.assertEqual(1, cache.hits)
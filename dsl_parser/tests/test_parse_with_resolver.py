@@ -13,6 +13,12 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import threading
+import time
+
+from dsl_parser import utils
+from dsl_parser.elements import imports
+from dsl_parser.exceptions import DSLParsingLogicException
 from dsl_parser.tests.abstract_test_parser import AbstractTestParser
 from dsl_parser.import_resolver.abstract_import_resolver import \
     AbstractImportResolver
@@ -61,3 +67,78 @@ imports:
         self.assertEqual(len(urls), 2)
         self.assertIn('http://url1', urls)
         self.assertIn('http://url2', urls)
+
+    def test_concurrent_fetch_keeps_import_order(self):
+        contents = {
+            'http://url1': _imports_yaml('http://url3', 'http://url4'),
+            'http://url2': _imports_yaml('http://url4', 'http://url5'),
+            'http://url3': _imports_yaml('http://url6'),
+            'http://url4': _imports_yaml('http://url6', 'http://url1'),
+            'http://url5': '{}',
+            'http://url6': '{}',
+        }
+        main_blueprint = utils.load_yaml(
+            _imports_yaml('http://url1', 'http://url2', 'http://url5'),
+            'error')
+
+        def ordered_imports(fetch_concurrency):
+            resolver = SlowResolver(contents, fetch_concurrency)
+            result = imports._build_ordered_imports(
+                parsed_dsl_holder=main_blueprint,
+                dsl_location=None,
+                resources_base_url=None,
+                resolver=resolver)
+            return [i['import'] for i in result], resolver
+
+        serial_order, serial_resolver = ordered_imports(1)
+        concurrent_order, concurrent_resolver = ordered_imports(4)
+        self.assertEqual(serial_order, concurrent_order)
+        self.assertEqual(sorted(contents), sorted(concurrent_resolver.urls))
+        self.assertEqual(1, serial_resolver.max_active)
+        self.assertGreater(concurrent_resolver.max_active, 1)
+
+    def test_concurrent_fetch_failure(self):
+        contents = {
+            'http://url1': _imports_yaml('http://missing'),
+            'http://url2': '{}',
+        }
+        yaml_to_parse = """
+imports:
+    -   http://url1
+    -   http://url2"""
+        ex = self.assertRaises(
+            DSLParsingLogicException, self.parse, yaml_to_parse,
+            resolver=SlowResolver(contents, fetch_concurrency=4))
+        self.assertIn('http://missing', str(ex))
+
+
+def _imports_yaml(*import_urls):
+    return 'imports:\n{0}'.format(
+        ''.join('  - {0}\n'.format(url) for url in import_urls))
+
+
+class SlowResolver(AbstractImportResolver):
+
+    def __init__(self, contents, fetch_concurrency):
+        self.contents = contents
+        self.fetch_concurrency = fetch_concurrency
+        self.urls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, url):
+        with self._lock:
+            self.urls.append(url)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.05)
+            if url not in self.contents:
+                raise DSLParsingLogicException(
+                    13, 'Import failed: Unable to open import url '
+                        '{0}'.format(url))
+            return self.contents[url]
+        finally:
+            with self._lock:
+                self.active -= 1
@@ -14,16 +14,19 @@
 #    * limitations under the License.
 
 import os
-import socket
-import StringIO
 import yaml as yml
 from urllib2 import HTTPError
 from urllib import pathname2url
 
+import mock
+import requests
+
 from dsl_parser import exceptions
 from dsl_parser import constants
 from dsl_parser import version
 from dsl_parser import models
+from dsl_parser.framework import parser as framework_parser
+from dsl_parser.framework.elements import UnknownElement
 from dsl_parser.tests.abstract_test_parser import AbstractTestParser
 from dsl_parser.parser import parse_from_path, parse_from_url
 from dsl_parser.parser import parse as dsl_parse
@@ -85,29 +88,14 @@ class TestParserApi(AbstractTestParser):
         self._assert_minimal_blueprint(result)
 
     def test_parse_dsl_from_bad_url(self):
-
-        class MockSocket(object):
-            def __init__(self, *args):
-                pass
-
-            def sendall(self, *args):
-                pass
-
-            def makefile(self, *args):
-                return StringIO.StringIO('HTTP/1.1 404\r\n')
-
-            def close(self):
-                pass
-
-        original_create_connection = socket.create_connection
-        try:
-            socket.create_connection = MockSocket
-            parse_from_url('http://www.google.com/bad-dsl')
-        except HTTPError as e:
-            self.assertIn('http://www.google.com/bad-dsl', str(e))
-            self.assertEqual(404, e.code)
-        finally:
-            socket.create_connection = original_create_connection
+        response = requests.Response()
+        response.status_code = 404
+        response.reason = 'Not Found'
+        with mock.patch('requests.Session.get', return_value=response):
+            ex = self.assertRaises(HTTPError, parse_from_url,
+                                   'http://www.google.com/bad-dsl')
+        self.assertIn('http://www.google.com/bad-dsl', str(ex))
+        self.assertEqual(404, ex.code)
 
     def _assert_blueprint(self, result):
         node = result['nodes'][0]
@@ -3248,3 +3236,26 @@ node_templates:
         plugin2 = node2['plugins_to_install'][0]
         self.assertEqual(expected_plugin1, plugin1)
         self.assertEqual(expected_plugin2, plugin2)
+
+    def test_unknown_top_level_keys_are_not_traversed(self):
+        added_elements = []
+        add_element = framework_parser.Context._add_element
+
+        def record_element(context, element, parent=None):
+            added_elements.append(element)
+            return add_element(context, element, parent=parent)
+
+        yaml = self.BASIC_NODE_TEMPLATES_SECTION + self.BASIC_PLUGIN + \
+            self.BASIC_TYPE
+        with mock.patch.object(framework_parser.Context, '_add_element',
+                               autospec=True, side_effect=record_element):
+            self.parse(yaml)
+        # the version extraction and imports passes only traverse the
+        # top level keys they need
+        self.assertFalse([e for e in added_elements
+                          if isinstance(e, UnknownElement)])
+
+    def test_non_string_top_level_key(self):
+        yaml = self.BASIC_NODE_TEMPLATES_SECTION + self.BASIC_PLUGIN + \
+            self.BASIC_TYPE + '\n1: value\n'
+        self._assert_dsl_parsing_exception_error_code(yaml, 1)
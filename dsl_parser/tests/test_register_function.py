@@ -100,6 +100,50 @@ outputs:
         self.assertEqual('PROPERTY_VALUE', o['output2'])
         self.assertEqual('ATTRIBUTE_VALUE', o['output3'])
 
+    def test_string_path(self):
+        paths = []
+
+        @functions.register(name='to_upper')
+        class ToUpper(functions.Function):
+
+            def parse_args(self, args):
+                paths.append(self.path)
+
+            def evaluate_runtime(self, storage):
+                return self.evaluate(plan=None)
+
+            def evaluate(self, plan):
+                return 'in %s' % self.path
+
+            def validate(self, plan):
+                pass
+
+        yaml = """
+node_types:
+    webserver_type:
+        properties:
+            property: {}
+node_templates:
+    webserver:
+        type: webserver_type
+        properties:
+            property: [{ to_upper: first }]
+outputs:
+    output1:
+        value: { to_upper: first }
+"""
+        parsed = prepare_deployment_plan(self.parse(yaml))
+        self.assertEqual('in outputs.output1.value',
+                         parsed['outputs']['output1']['value'])
+        self.assertEqual(['in webserver.properties.property[0]'],
+                         parsed['nodes'][0]['properties']['property'])
+        functions.evaluate_functions({'a': {'to_upper': 'x'}}, {},
+                                     None, None, None)
+        self.assertTrue(paths)
+        for path in paths:
+            self.assertIs(str, type(path))
+        self.assertEqual('payload.a', paths[-1])
+
 
 class NodeInstance(dict):
 
@@ -0,0 +1,72 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import shutil
+import tempfile
+from urllib import pathname2url
+
+import mock
+import testtools
+
+from dsl_parser import utils
+
+
+class TestResourceIndex(testtools.TestCase):
+
+    def setUp(self):
+        super(TestResourceIndex, self).setUp()
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir)
+        os.makedirs(os.path.join(self.base_dir, 'scripts', 'nested'))
+        for name in ['a.sh', 'b.sh', 'with space.sh']:
+            with open(os.path.join(self.base_dir, 'scripts', name), 'w'):
+                pass
+        self.base_url = 'file:{0}'.format(pathname2url(self.base_dir))
+
+    def test_file_base(self):
+        index = utils.ResourceIndex([None, self.base_url])
+        with mock.patch('dsl_parser.utils.url_exists') as url_exists:
+            self.assertTrue(index.exists('scripts/a.sh'))
+            self.assertTrue(index.exists('scripts/b.sh'))
+            self.assertTrue(index.exists('scripts/with%20space.sh'))
+            self.assertFalse(index.exists('scripts/c.sh'))
+            self.assertFalse(index.exists('scripts/nested'))
+            self.assertFalse(index.exists('missing/a.sh'))
+        self.assertFalse(url_exists.called)
+
+    def test_directory_listed_once(self):
+        index = utils.ResourceIndex([self.base_url])
+        with mock.patch('os.listdir', wraps=os.listdir) as listdir:
+            index.exists('scripts/a.sh')
+            index.exists('scripts/b.sh')
+            index.exists('scripts/c.sh')
+        self.assertEqual(1, listdir.call_count)
+
+    def test_url_base_memoized(self):
+        session = object()
+        index = utils.ResourceIndex(['http://host/base', self.base_url],
+                                    session=session)
+        with mock.patch('dsl_parser.utils.url_exists',
+                        return_value=False) as url_exists:
+            for _ in range(3):
+                self.assertTrue(index.exists('scripts/a.sh'))
+        url_exists.assert_called_once_with('http://host/base/scripts/a.sh',
+                                           session=session)
+
+    def test_empty(self):
+        index = utils.ResourceIndex([None, ''])
+        self.assertFalse(index)
+        self.assertFalse(index.exists('scripts/a.sh'))
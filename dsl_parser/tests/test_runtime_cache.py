@@ -0,0 +1,111 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import testtools
+
+from dsl_parser import functions
+from dsl_parser.runtime_cache import RuntimeEvaluationCache
+from dsl_parser.tests.test_get_attribute import (Node,
+                                                 NodeInstance)
+
+
+class TestRuntimeEvaluationCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestRuntimeEvaluationCache, self).setUp()
+        self.versions = {'node_1': 1}
+        self.fetched = []
+
+    def _get_node_instance(self, node_instance_id):
+        self.fetched.append(node_instance_id)
+        return NodeInstance({
+            'id': node_instance_id,
+            'node_id': 'node',
+            'runtime_properties': {
+                'version': self.versions[node_instance_id]
+            }
+        })
+
+    def _get_node(self, node_id):
+        self.fetched.append(node_id)
+        return Node({'id': node_id, 'properties': {'property': 'value'}})
+
+    def _evaluate(self, cache, deployment_id='deployment'):
+        payload = {
+            'version': {'get_attribute': ['SELF', 'version']},
+            'property': {'get_attribute': ['SELF', 'property']}
+        }
+        return functions.evaluate_functions(
+            payload, {'self': 'node_1'},
+            None, self._get_node_instance, self._get_node,
+            runtime_cache=cache.deployment(deployment_id,
+                                           self.versions.get))
+
+    def test_shared_across_evaluations(self):
+        cache = RuntimeEvaluationCache()
+        for _ in range(3):
+            self.assertEqual({'version': 1, 'property': 'value'},
+                             self._evaluate(cache))
+        self.assertEqual(['node_1', 'node'], self.fetched)
+        stats = cache.stats()
+        self.assertEqual(4, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+        self.assertEqual(2, stats['entries'])
+
+    def test_version_change_invalidates(self):
+        cache = RuntimeEvaluationCache()
+        self._evaluate(cache)
+        self.versions['node_1'] = 2
+        self.assertEqual({'version': 2, 'property': 'value'},
+                         self._evaluate(cache))
+        self.assertEqual(['node_1', 'node', 'node_1'], self.fetched)
+        self.assertEqual(1, cache.stats()['invalidations'])
+
+    def test_keyed_by_deployment(self):
+        cache = RuntimeEvaluationCache()
+        self._evaluate(cache, 'deployment_1')
+        self._evaluate(cache, 'deployment_2')
+        self.assertEqual(['node_1', 'node', 'node_1', 'node'], self.fetched)
+        cache.invalidate('deployment_1')
+        self.assertEqual(2, len(cache))
+        self.assertEqual(2, cache.stats()['invalidations'])
+
+    def test_no_version_method(self):
+        cache = RuntimeEvaluationCache()
+        view = cache.deployment('deployment')
+        view.get_node_instance('node_1', self._get_node_instance)
+        view.get_node_instance('node_1', self._get_node_instance)
+        self.assertEqual(['node_1', 'node_1'], self.fetched)
+        self.assertEqual(0, len(cache))
+
+    def test_lru_eviction(self):
+        cache = RuntimeEvaluationCache(max_entries=2)
+        cache.put('key1', 'value1')
+        cache.put('key2', 'value2')
+        # touch key1 so key2 becomes the least recently used entry
+        cache.get('key1')
+        cache.put('key3', 'value3')
+        self.assertEqual('value1', cache.get('key1'))
+        self.assertIsNone(cache.get('key2'))
+        self.assertEqual('value3', cache.get('key3'))
+        self.assertEqual(1, cache.stats()['evictions'])
+
+    def test_private_copies(self):
+        cache = RuntimeEvaluationCache()
+        value = {'nested': {'key': 'value'}}
+        cache.put('key', value)
+        value['nested']['key'] = 'changed'
+        cache.get('key')['nested']['key'] = 'changed'
+        self.assertEqual({'nested': {'key': 'value'}}, cache.get('key'))
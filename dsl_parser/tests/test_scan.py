@@ -0,0 +1,121 @@
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import copy
+
+import testtools
+
+from dsl_parser import (functions,
+                        scan)
+
+
+class TestLazyPathScan(testtools.TestCase):
+
+    value = {
+        'a': 'value',
+        'b': {'c': [1, {'d': 'replace'}, ['e', 'replace']]},
+        'f': [[{'g': 'replace'}]]
+    }
+
+    def _scan(self, lazy_path, recursive=True):
+        value = copy.deepcopy(self.value)
+        visited = []
+
+        def handler(v, scope, context, path):
+            visited.append((str(path), copy.deepcopy(v), scope, context))
+            if v == 'replace':
+                return 'replaced'
+            return v
+        scan.scan_properties(value, handler,
+                             scope='scope',
+                             context='context',
+                             path='base',
+                             replace=True,
+                             recursive=recursive,
+                             lazy_path=lazy_path)
+        return value, visited
+
+    def test_same_as_recursive_scan(self):
+        expected = self._scan(lazy_path=False)
+        self.assertEqual(expected, self._scan(lazy_path=True))
+        self.assertIn('base.b.c[1]', [path for path, _, _, _ in expected[1]])
+        self.assertIn('base.b.c.d', [path for path, _, _, _ in expected[1]])
+        self.assertEqual(self._scan(lazy_path=False, recursive=False),
+                         self._scan(lazy_path=True, recursive=False))
+
+    def test_lazy_path(self):
+        paths = []
+        scan.scan_properties({'a': [{'b': 1}]},
+                             lambda v, scope, context, path: paths.append(
+                                 path),
+                             path='base',
+                             lazy_path=True)
+        self.assertEqual(['base.a', 'base.a[0]', 'base.a.b'], paths)
+        path = paths[1]
+        self.assertIsInstance(path, scan.LazyPath)
+        self.assertEqual('base.a[0]', str(path))
+        self.assertEqual('in base.a[0]', 'in {0}'.format(path))
+        self.assertEqual(hash('base.a[0]'), hash(path))
+        self.assertEqual('base.a[0].x', path + '.x')
+        self.assertEqual('x.base.a[0]', 'x.' + path)
+        self.assertTrue(path.startswith('base.a'))
+
+
+class TestFunctionMarkers(testtools.TestCase):
+
+    value = {
+        'a': {'b': [1, {'c': 2}]},
+        'd': [{'e': {'get_input': 'input'}}, 'f'],
+        'g': {'concat': ['h', {'get_property': ['SELF', 'i']}]}
+    }
+
+    def test_mark(self):
+        markers = scan.FunctionMarkers()
+        self.assertTrue(markers.mark(self.value, functions.is_function))
+        self.assertFalse(markers.mark({'a': [1]}, functions.is_function))
+        for marked in [self.value,
+                       self.value['d'],
+                       self.value['d'][0],
+                       self.value['d'][0]['e'],
+                       self.value['g'],
+                       self.value['g']['concat'],
+                       self.value['g']['concat'][1]]:
+            self.assertIn(marked, markers)
+        self.assertNotIn(self.value['a'], markers)
+        self.assertNotIn(self.value['a']['b'], markers)
+        self.assertEqual(7, len(markers))
+
+    def test_scan_skips_unmarked_containers(self):
+        markers = scan.FunctionMarkers()
+        markers.mark(self.value, functions.is_function)
+        expected = set(['base.a', 'base.d', 'base.d[0]', 'base.d[1]',
+                        'base.d.e', 'base.d.e.get_input', 'base.g',
+                        'base.g.concat', 'base.g.concat[0]',
+                        'base.g.concat[1]', 'base.g.concat.get_property'])
+        for lazy_path in [False, True]:
+            paths = []
+            scan.scan_properties(self.value,
+                                 lambda v, scope, context, path: paths.append(
+                                     str(path)),
+                                 path='base',
+                                 lazy_path=lazy_path,
+                                 markers=markers)
+            self.assertEqual(expected, set(paths))
+        paths = []
+        scan.scan_properties({'a': [1]},
+                             lambda v, scope, context, path: paths.append(
+                                 path),
+                             markers=markers)
+        self.assertEqual([], paths)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+########
+# Copyright (c) 2017 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import yaml
+import testtools
+
+from dsl_parser import (exceptions,
+                        yaml_loader)
+
+
+DOCUMENTS = [
+    '',
+    '# just a comment\n',
+    'key: value\n',
+    'a: 1\nb: 2.5\nc: true\nd: ~\ne: null\n',
+    'list: [1, 2, {c: d}]\nflow: {x: [y, z]}\n',
+    '- plain scalar\n- \'single\'\n- "double"\n-\n- - nested\n  - list\n',
+    'literal: |\n  multi\n  line\nfolded: >\n  folded\n  text\n\n',
+    'kept: |+\n  text\n\nstripped: |-\n  text\n',
+    'node_templates:\n  vm:\n    type: Compute\n    properties:\n'
+    '      port: 8080\n      tags: [a, b]\n',
+    'anchor: &anchor\n  x: 1\nalias: *anchor\n',
+    'base: &base {a: 1}\nmerged:\n  <<: *base\n  b: 2\n',
+    'a: !!set {x, y}\n',
+    'a: !!omap [x: 1, y: 2]\n',
+    'a: !!pairs [x: 1, x: 2]\n',
+    'a: !!binary aGVsbG8=\n',
+    'a: !!str 1\nb: !!int "2"\nc: !!float "3"\n',
+    'a: 2001-12-14t21:59:43.10-05:00\nb: 2002-12-14\n',
+    '---\na: 1\n...\n',
+    'a:    spaced     \n?  complex\n:  value\n',
+    '"quoted key": \'quoted value\'\n',
+    'a: "escaped \\t \\" \\u0041"\n',
+    'a:\n\n\n  b: after blank lines\n',
+    'a: 1 # trailing comment\nb: 2\n',
+]
+
+
+def _dump(value_holder):
+    """Return the restored value along with the marks of every holder."""
+    if isinstance(value_holder, tuple):
+        # !!omap and !!pairs entries
+        return tuple(_dump(item) for item in value_holder)
+    value = value_holder.value
+    marks = (value_holder.start_line,
+             value_holder.start_column,
+             value_holder.end_line,
+             value_holder.end_column,
+             value_holder.filename)
+    if isinstance(value, dict):
+        items = sorted((_dump(k), _dump(v)) for k, v in value.iteritems())
+        return marks, 'dict', items
+    if isinstance(value, set):
+        return marks, 'set', sorted(_dump(item) for item in value)
+    if isinstance(value, list):
+        return marks, 'list', [_dump(item) for item in value]
+    return marks, type(value), value
+
+
+@testtools.skipIf(yaml_loader.CMarkedLoader is None,
+                  'PyYAML was built without libyaml')
+class TestCMarkedLoaderParity(testtools.TestCase):
+
+    def _load(self, loader, document):
+        return yaml_loader.load(document, 'test.yaml', loader=loader)
+
+    def _assert_parity(self, document):
+        expected = self._load(yaml_loader.MarkedLoader, document)
+        actual = self._load(yaml_loader.CMarkedLoader, document)
+        self.assertEqual(_dump(expected), _dump(actual),
+                         'parity failed for {0!r}'.format(document))
+
+    def test_documents(self):
+        for document in DOCUMENTS:
+            self._assert_parity(document)
+
+    def test_unicode_document(self):
+        for document in DOCUMENTS:
+            self._assert_parity(document.decode('ascii'))
+
+    def test_is_default_loader(self):
+        self.assertIs(yaml_loader.CMarkedLoader, yaml_loader.DefaultLoader)
+
+    def _assert_same_error(self, document, expected_error):
+        for loader in [yaml_loader.MarkedLoader, yaml_loader.CMarkedLoader]:
+            self.assertRaises(expected_error, self._load, loader, document)
+
+    def test_illegal_characters(self):
+        document = u'a: b\nc: ש\n'
+        errors = []
+        for loader in [yaml_loader.MarkedLoader, yaml_loader.CMarkedLoader]:
+            ex = self.assertRaises(
+                exceptions.DSLParsingInputTypeException,
+                self._load, loader, document)
+            errors.append((ex.err_code, str(ex)))
+        self.assertEqual(errors[0], errors[1])
+        self.assertEqual(exceptions.ERROR_INVALID_CHARS, errors[0][0])
+
+    def test_parser_error(self):
+        self._assert_same_error('a: [1, 2', yaml.parser.ParserError)
+        self._assert_same_error('- a\nb: 1', yaml.parser.ParserError)
+
+    def test_scanner_error(self):
+        self._assert_same_error('a: b: c', yaml.scanner.ScannerError)
+        self._assert_same_error("a: 'x", yaml.scanner.ScannerError)
+
+    def test_reader_error(self):
+        self._assert_same_error('a: \x07', yaml.reader.ReaderError)
+
+    def test_composer_error(self):
+        self._assert_same_error('a: *missing', yaml.composer.ComposerError)
+        self._assert_same_error('a: 1\n---\nb: 2\n',
+                                yaml.composer.ComposerError)
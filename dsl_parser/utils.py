@@ -13,10 +13,14 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import collections
 import copy
 import contextlib
 import importlib
+import os
+import urllib
 import urllib2
+import urlparse
 import sys
 
 import yaml.parser
@@ -69,7 +73,9 @@ def merge_schemas(overridden_schema,
                     path=[],
                     raise_on_missing_property=False)
                 if default_value:
-                    merged[key]['default'] = default_value
+                    # a copy, the overriding schema is not changed
+                    merged[key] = dict(overriding_property,
+                                       default=default_value)
     return merged
 
 
@@ -239,7 +245,9 @@ def load_yaml(raw_yaml, error_message, filename=None):
                                         .format(error_message, ex))
 
 
-def url_exists(url):
+def url_exists(url, session=None):
+    if session is not None and url.split(':')[0] in ['http', 'https']:
+        return session.exists(url)
     try:
         with contextlib.closing(urllib2.urlopen(url)):
             return True
@@ -247,6 +255,134 @@ def url_exists(url):
         return False
 
 
+class ResourceIndex(object):
+    """
+    Answers whether a resource exists relative to any of the resource
+    bases, for the duration of a single parse.
+
+    Results are memoized per (resource base, resource name). ``file:``
+    bases are answered from (memoized) directory listings instead of
+    opening each resource, and http(s) bases are probed once per resource
+    through ``session``, when one is supplied.
+    """
+
+    def __init__(self, resource_bases, session=None):
+        self.resource_bases = [resource_base for resource_base
+                               in resource_bases or [] if resource_base]
+        self.session = session
+        self._exists = {}
+        self._listings = {}
+
+    def __iter__(self):
+        return iter(self.resource_bases)
+
+    def __len__(self):
+        return len(self.resource_bases)
+
+    def exists(self, resource_name):
+        return any(self._resource_exists(resource_base, resource_name)
+                   for resource_base in self.resource_bases)
+
+    def _resource_exists(self, resource_base, resource_name):
+        key = (resource_base, resource_name)
+        if key not in self._exists:
+            url = '{0}/{1}'.format(resource_base, resource_name)
+            if url.startswith('file:'):
+                self._exists[key] = self._file_exists(url)
+            else:
+                self._exists[key] = url_exists(url, session=self.session)
+        return self._exists[key]
+
+    def _file_exists(self, url):
+        path = os.path.normpath(
+            urllib.url2pathname(urlparse.urlparse(url).path))
+        directory, name = os.path.split(path)
+        if directory not in self._listings:
+            try:
+                self._listings[directory] = set(os.listdir(directory))
+            except OSError:
+                self._listings[directory] = set()
+        return (name in self._listings[directory] and
+                not os.path.isdir(path))
+
+
+def find_cycle(nodes, successors):
+    """Return a single cycle of a directed graph as the list of its nodes,
+    or None if the graph has no cycles.
+
+    Nodes that are part of a cycle are found using Tarjan's strongly
+    connected components algorithm, and the shortest cycle through the first
+    of them is returned, so this runs in linear time (as opposed to
+    enumerating all the simple cycles of the graph).
+
+    :param nodes: The graph nodes, in the order they are looked at (any
+                  iterable, it is only consumed once).
+    :param successors: A method returning the successors of a node.
+    """
+    nodes = list(nodes)
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    node_component = {}
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            node, node_successors = work[-1]
+            for successor in node_successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(successors(successor))))
+                    break
+                elif successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] != index[node]:
+                    continue
+                component = set()
+                while node not in component:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.add(member)
+                if len(component) > 1 or node in successors(node):
+                    for member in component:
+                        node_component[member] = component
+
+    start = next((node for node in nodes if node in node_component), None)
+    if start is None:
+        return None
+    component = node_component[start]
+    parents = {}
+    queue = collections.deque([start])
+    while queue:
+        current = queue.popleft()
+        for successor in successors(current):
+            if successor == start:
+                cycle = []
+                while current != start:
+                    cycle.append(current)
+                    current = parents[current]
+                cycle.append(start)
+                cycle.reverse()
+                return cycle
+            if successor in component and successor not in parents:
+                parents[successor] = current
+                queue.append(successor)
+    raise ValueError('Illegal state: {0} is not part of a cycle'
+                     .format(start))
+
+
 def create_import_resolver(resolver_configuration):
     if resolver_configuration:
         resolver_class_path = resolver_configuration.get(
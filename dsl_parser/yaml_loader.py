@@ -19,6 +19,11 @@ from yaml.composer import Composer
 from yaml.resolver import Resolver
 from yaml.parser import Parser
 from yaml.constructor import SafeConstructor
+try:
+    from yaml.cyaml import CParser
+except ImportError:
+    # PyYAML was built without libyaml
+    CParser = None
 
 from dsl_parser import holder
 from .exceptions import DSLParsingInputTypeException, ERROR_INVALID_CHARS
@@ -155,8 +160,27 @@ class MarkedLoader(Reader, Scanner, Parser, Composer, HolderConstructor,
         Resolver.__init__(self)
 
 
-def load(stream, filename):
-    result = MarkedLoader(stream, filename).get_single_data()
+if CParser is not None:
+    class CMarkedLoader(CParser, HolderConstructor, Resolver):
+        """Holder producing loader that scans, parses and composes using
+        libyaml. Marks and constructed holders are the same as those of
+        ``MarkedLoader``, only yaml syntax error messages are worded
+        differently."""
+
+        def __init__(self, stream, filename=None):
+            CParser.__init__(self, stream)
+            HolderConstructor.__init__(self, filename)
+            Resolver.__init__(self)
+
+    DefaultLoader = CMarkedLoader
+else:
+    CMarkedLoader = None
+    DefaultLoader = MarkedLoader
+
+
+def load(stream, filename, loader=None):
+    loader = loader or DefaultLoader
+    result = loader(stream, filename).get_single_data()
     if result is None:
         # load of empty string returns None so we convert it to an empty
         # dict